@@ -23,10 +23,8 @@ class BackendClient:
         if self._client is None:
             self._client = httpx.AsyncClient(
                 timeout=httpx.Timeout(120.0, connect=30.0),
-                headers={
-                    "X-API-Key": self.api_key,
-                    "Content-Type": "application/json"
-                }
+                # No default Content-Type: json= and files= set their own
+                headers={"X-API-Key": self.api_key}
             )
         return self._client
 
@@ -227,15 +225,10 @@ class BackendClient:
         logger.info(f"Sending voice message to backend: user={user_id}, size={len(audio_bytes)} bytes")
 
         try:
-            async with httpx.AsyncClient(timeout=90.0) as client:
-                response = await client.post(
-                    url,
-                    headers={"X-API-Key": self.api_key},
-                    files=files,
-                    data=data
-                )
-                response.raise_for_status()
-                result = response.json()
+            client = await self._get_client()
+            response = await client.post(url, files=files, data=data, timeout=90.0)
+            response.raise_for_status()
+            result = response.json()
 
             transcription = result.get("transcription")
             response_text = result.get("response")
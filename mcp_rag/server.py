@@ -1,10 +1,15 @@
 """MCP server for RAG-based documentation retrieval."""
 
 import asyncio
-import json
+import io
 import logging
 import os
 import sys
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import anyio
+import orjson
 
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
@@ -32,6 +37,63 @@ github_fetcher: GitHubFetcher = None
 rag_engine: RAGEngine = None
 index_built: bool = False
 
+# Serialized responses of GitHub listing tools: key -> (expires_at, json text)
+LIST_SPECS_CACHE_TTL = 30  # seconds
+PROJECT_STRUCTURE_CACHE_TTL = 300  # seconds
+_response_cache: Dict[Tuple, Tuple[float, str]] = {}
+
+# Write buffer for MCP responses on stdout
+STDOUT_BUFFER_SIZE = 64 * 1024
+
+
+# Tool responses are read by the model, not humans: emit compact JSON unless
+# MCP_PRETTY_JSON is set for debugging
+_ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+if os.getenv("MCP_PRETTY_JSON"):
+    _ORJSON_OPTIONS |= orjson.OPT_INDENT_2
+
+
+def _dumps(obj: Any) -> str:
+    """Serialize a tool response to JSON text (handles numpy scalars natively)."""
+    return orjson.dumps(obj, option=_ORJSON_OPTIONS).decode()
+
+
+# Constant error responses, serialized once at import
+_ERR_QUERY_REQUIRED = _dumps({"error": "Query is required"})
+_ERR_FILENAME_REQUIRED = _dumps({"error": "Filename is required"})
+_ERR_NO_DOCUMENTS = _dumps({"success": False, "error": "No documentation files found"})
+_ERR_NO_CHUNKS = _dumps({"success": False, "error": "Failed to build index - no chunks created"})
+
+
+def _cache_get(key: Tuple) -> Optional[str]:
+    """Return a cached serialized response, or None if missing or expired."""
+    cached = _response_cache.get(key)
+    if cached is None:
+        return None
+    expires_at, text = cached
+    if expires_at <= time.monotonic():
+        del _response_cache[key]
+        return None
+    return text
+
+
+def _cache_put(key: Tuple, text: str, ttl: float) -> None:
+    """Store a serialized response for ttl seconds."""
+    _response_cache[key] = (time.monotonic() + ttl, text)
+
+
+def _buffered_stdout() -> "anyio.AsyncFile[str]":
+    """
+    Wrap stdout in a large write buffer for the MCP transport.
+
+    The transport flushes after every message, so each JSON-RPC frame reaches
+    the pipe in a single write instead of being split at the default 8 KiB
+    buffer boundary.
+    """
+    raw = io.FileIO(sys.stdout.fileno(), "wb", closefd=False)
+    buffered = io.BufferedWriter(raw, buffer_size=STDOUT_BUFFER_SIZE)
+    return anyio.wrap_file(io.TextIOWrapper(buffered, encoding="utf-8"))
+
 
 def get_github_fetcher() -> GitHubFetcher:
     """Get or create GitHub fetcher instance."""
@@ -54,82 +116,86 @@ def get_rag_engine() -> RAGEngine:
     return rag_engine
 
 
+# Tool definitions are static, so build them once at import
+_TOOLS: list[Tool] = [
+    Tool(
+        name="rag_query",
+        description="Search project documentation using RAG. Retrieves relevant documentation chunks based on semantic similarity. Use this to find information about the EasyPomodoro project architecture, features, and implementation details.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "The search query to find relevant documentation"
+                },
+                "top_k": {
+                    "type": "integer",
+                    "description": "Number of results to return (default: 5)",
+                    "default": 5
+                }
+            },
+            "required": ["query"]
+        }
+    ),
+    Tool(
+        name="list_specs",
+        description="List all available specification files in the project documentation folder. Returns file names and paths.",
+        inputSchema={
+            "type": "object",
+            "properties": {},
+            "required": []
+        }
+    ),
+    Tool(
+        name="get_spec_content",
+        description="Get the full content of a specific specification file. Use this when you need to read an entire documentation file.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "filename": {
+                    "type": "string",
+                    "description": "Name of the specification file to retrieve"
+                }
+            },
+            "required": ["filename"]
+        }
+    ),
+    Tool(
+        name="rebuild_index",
+        description="Rebuild the RAG index by fetching fresh documentation from GitHub. Use this if the documentation has been updated.",
+        inputSchema={
+            "type": "object",
+            "properties": {},
+            "required": []
+        }
+    ),
+    Tool(
+        name="get_project_structure",
+        description="Get the project directory structure as a tree. Use this FIRST to find file paths before using get_file_contents.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "path": {
+                    "type": "string",
+                    "description": "Starting path (e.g., 'app/src/main/java'). Empty for root.",
+                    "default": ""
+                },
+                "max_depth": {
+                    "type": "integer",
+                    "description": "Max depth to traverse (default: 4)",
+                    "default": 4
+                }
+            },
+            "required": []
+        }
+    ),
+]
+
+
 @server.list_tools()
 async def list_tools() -> list[Tool]:
     """List available RAG tools."""
-    return [
-        Tool(
-            name="rag_query",
-            description="Search project documentation using RAG. Retrieves relevant documentation chunks based on semantic similarity. Use this to find information about the EasyPomodoro project architecture, features, and implementation details.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "query": {
-                        "type": "string",
-                        "description": "The search query to find relevant documentation"
-                    },
-                    "top_k": {
-                        "type": "integer",
-                        "description": "Number of results to return (default: 5)",
-                        "default": 5
-                    }
-                },
-                "required": ["query"]
-            }
-        ),
-        Tool(
-            name="list_specs",
-            description="List all available specification files in the project documentation folder. Returns file names and paths.",
-            inputSchema={
-                "type": "object",
-                "properties": {},
-                "required": []
-            }
-        ),
-        Tool(
-            name="get_spec_content",
-            description="Get the full content of a specific specification file. Use this when you need to read an entire documentation file.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "filename": {
-                        "type": "string",
-                        "description": "Name of the specification file to retrieve"
-                    }
-                },
-                "required": ["filename"]
-            }
-        ),
-        Tool(
-            name="rebuild_index",
-            description="Rebuild the RAG index by fetching fresh documentation from GitHub. Use this if the documentation has been updated.",
-            inputSchema={
-                "type": "object",
-                "properties": {},
-                "required": []
-            }
-        ),
-        Tool(
-            name="get_project_structure",
-            description="Get the project directory structure as a tree. Use this FIRST to find file paths before using get_file_contents.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "path": {
-                        "type": "string",
-                        "description": "Starting path (e.g., 'app/src/main/java'). Empty for root.",
-                        "default": ""
-                    },
-                    "max_depth": {
-                        "type": "integer",
-                        "description": "Max depth to traverse (default: 4)",
-                        "default": 4
-                    }
-                },
-                "required": []
-            }
-        ),
-    ]
+    return _TOOLS
 
 
 @server.call_tool()
@@ -149,10 +215,10 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
         elif name == "get_project_structure":
             return await handle_get_project_structure(arguments)
         else:
-            return [TextContent(type="text", text=json.dumps({"error": f"Unknown tool: {name}"}))]
+            return [TextContent(type="text", text=_dumps({"error": f"Unknown tool: {name}"}))]
     except Exception as e:
         logger.error(f"Tool {name} error: {e}", exc_info=True)
-        return [TextContent(type="text", text=json.dumps({"error": str(e)}))]
+        return [TextContent(type="text", text=_dumps({"error": str(e)}))]
 
 
 async def ensure_index_built() -> bool:
@@ -173,7 +239,10 @@ async def ensure_index_built() -> bool:
             logger.warning("No documentation files found")
             return False
 
-        documents = [{"filename": d["filename"], "content": d["content"]} for d in docs]
+        documents = [
+            {"filename": d["filename"], "content": d["content"], "sha": d.get("sha")}
+            for d in docs
+        ]
         chunk_count = await engine.build_index(documents)
 
         if chunk_count > 0:
@@ -197,12 +266,12 @@ async def handle_rag_query(arguments: dict) -> list[TextContent]:
     top_k = arguments.get("top_k", 5)
 
     if not query:
-        return [TextContent(type="text", text=json.dumps({"error": "Query is required"}))]
+        return [TextContent(type="text", text=_ERR_QUERY_REQUIRED)]
 
     try:
         await ensure_index_built()
     except OllamaError as e:
-        return [TextContent(type="text", text=json.dumps({
+        return [TextContent(type="text", text=_dumps({
             "error": f"Ollama not available: {e}. Please ensure Ollama is running with nomic-embed-text model."
         }))]
 
@@ -210,7 +279,7 @@ async def handle_rag_query(arguments: dict) -> list[TextContent]:
     results = await engine.search(query, top_k=top_k)
 
     if not results:
-        return [TextContent(type="text", text=json.dumps({
+        return [TextContent(type="text", text=_dumps({
             "query": query,
             "results": [],
             "message": "No relevant documentation found"
@@ -230,11 +299,16 @@ async def handle_rag_query(arguments: dict) -> list[TextContent]:
         "results": formatted_results
     }
 
-    return [TextContent(type="text", text=json.dumps(response, ensure_ascii=False, indent=2))]
+    return [TextContent(type="text", text=_dumps(response))]
 
 
 async def handle_list_specs() -> list[TextContent]:
     """Handle list_specs tool call."""
+    cache_key = ("list_specs",)
+    text = _cache_get(cache_key)
+    if text is not None:
+        return [TextContent(type="text", text=text)]
+
     fetcher = get_github_fetcher()
 
     try:
@@ -244,9 +318,11 @@ async def handle_list_specs() -> list[TextContent]:
             "files_count": len(files),
             "files": [{"name": f["name"], "path": f["path"]} for f in files]
         }
-        return [TextContent(type="text", text=json.dumps(response, ensure_ascii=False, indent=2))]
+        text = _dumps(response)
+        _cache_put(cache_key, text, LIST_SPECS_CACHE_TTL)
+        return [TextContent(type="text", text=text)]
     except Exception as e:
-        return [TextContent(type="text", text=json.dumps({"error": str(e)}))]
+        return [TextContent(type="text", text=_dumps({"error": str(e)}))]
 
 
 async def handle_get_spec_content(arguments: dict) -> list[TextContent]:
@@ -254,7 +330,7 @@ async def handle_get_spec_content(arguments: dict) -> list[TextContent]:
     filename = arguments.get("filename", "")
 
     if not filename:
-        return [TextContent(type="text", text=json.dumps({"error": "Filename is required"}))]
+        return [TextContent(type="text", text=_ERR_FILENAME_REQUIRED)]
 
     fetcher = get_github_fetcher()
 
@@ -266,9 +342,9 @@ async def handle_get_spec_content(arguments: dict) -> list[TextContent]:
             "path": file_path,
             "content": content
         }
-        return [TextContent(type="text", text=json.dumps(response, ensure_ascii=False, indent=2))]
+        return [TextContent(type="text", text=_dumps(response))]
     except Exception as e:
-        return [TextContent(type="text", text=json.dumps({"error": str(e)}))]
+        return [TextContent(type="text", text=_dumps({"error": str(e)}))]
 
 
 async def handle_rebuild_index() -> list[TextContent]:
@@ -280,6 +356,7 @@ async def handle_rebuild_index() -> list[TextContent]:
 
     try:
         fetcher.clear_cache()
+        _response_cache.clear()
         engine.clear_index()
         index_built = False
 
@@ -287,36 +364,33 @@ async def handle_rebuild_index() -> list[TextContent]:
         docs = await fetcher.get_all_specs_content()
 
         if not docs:
-            return [TextContent(type="text", text=json.dumps({
-                "success": False,
-                "error": "No documentation files found"
-            }))]
+            return [TextContent(type="text", text=_ERR_NO_DOCUMENTS)]
 
-        documents = [{"filename": d["filename"], "content": d["content"]} for d in docs]
+        documents = [
+            {"filename": d["filename"], "content": d["content"], "sha": d.get("sha")}
+            for d in docs
+        ]
         chunk_count = await engine.build_index(documents)
 
         if chunk_count > 0:
             index_built = True
             stats = engine.get_index_stats()
-            return [TextContent(type="text", text=json.dumps({
+            return [TextContent(type="text", text=_dumps({
                 "success": True,
                 "message": "Index rebuilt successfully",
                 "stats": stats
-            }, ensure_ascii=False, indent=2))]
-        else:
-            return [TextContent(type="text", text=json.dumps({
-                "success": False,
-                "error": "Failed to build index - no chunks created"
             }))]
+        else:
+            return [TextContent(type="text", text=_ERR_NO_CHUNKS)]
 
     except OllamaError as e:
-        return [TextContent(type="text", text=json.dumps({
+        return [TextContent(type="text", text=_dumps({
             "success": False,
             "error": f"Ollama not available: {e}"
         }))]
     except Exception as e:
         logger.error(f"Error rebuilding index: {e}", exc_info=True)
-        return [TextContent(type="text", text=json.dumps({
+        return [TextContent(type="text", text=_dumps({
             "success": False,
             "error": str(e)
         }))]
@@ -327,18 +401,27 @@ async def handle_get_project_structure(arguments: dict) -> list[TextContent]:
     path = arguments.get("path", "")
     max_depth = arguments.get("max_depth", 4)
 
+    cache_key = ("project_structure", path, max_depth)
+    text = _cache_get(cache_key)
+    if text is not None:
+        return [TextContent(type="text", text=text)]
+
     fetcher = get_github_fetcher()
 
     try:
-        structure = await fetcher.get_directory_tree(path, max_depth)
+        structure, complete = await fetcher.get_directory_tree(path, max_depth)
         response = {
             "repository": f"{GITHUB_OWNER}/{GITHUB_REPO}",
             "path": path or "/",
             "structure": structure
         }
-        return [TextContent(type="text", text=json.dumps(response, ensure_ascii=False, indent=2))]
+        text = _dumps(response)
+        # A tree with failed subdirectories is returned but not cached
+        if complete:
+            _cache_put(cache_key, text, PROJECT_STRUCTURE_CACHE_TTL)
+        return [TextContent(type="text", text=text)]
     except Exception as e:
-        return [TextContent(type="text", text=json.dumps({"error": str(e)}))]
+        return [TextContent(type="text", text=_dumps({"error": str(e)}))]
 
 
 async def main():
@@ -347,12 +430,18 @@ async def main():
     logger.info(f"GitHub repo: {GITHUB_OWNER}/{GITHUB_REPO}")
     logger.info(f"Specs path: {SPECS_PATH}")
 
-    async with stdio_server() as (read_stream, write_stream):
-        await server.run(
-            read_stream,
-            write_stream,
-            server.create_initialization_options()
-        )
+    try:
+        async with stdio_server(stdout=_buffered_stdout()) as (read_stream, write_stream):
+            await server.run(
+                read_stream,
+                write_stream,
+                server.create_initialization_options()
+            )
+    finally:
+        if rag_engine is not None:
+            await rag_engine.close()
+        if github_fetcher is not None:
+            await github_fetcher.close()
 
 
 if __name__ == "__main__":
@@ -1,9 +1,14 @@
 """FastAPI router with chat endpoint."""
 
+import asyncio
 import logging
-from fastapi import APIRouter, Depends, HTTPException, status, File, Form, UploadFile
+import os
+import tempfile
+from typing import Dict, Tuple
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, File, Form, UploadFile
 
-from auth import verify_api_key
 from schemas import (
     ChatRequest, ChatResponse, HealthResponse, ErrorResponse,
     ReviewPRRequest, ReviewPRResponse,
@@ -13,29 +18,36 @@ from schemas import (
 from chat_service import ChatService
 from profile_manager import get_profile_manager
 from audio_service import get_audio_service, AudioService
+from config import VOICE_MAX_FILE_SIZE_MB
+from logger import log_error_throttled
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Global chat service instance (initialized in main.py)
-_chat_service: ChatService = None
+# Voice upload limits
+VOICE_MAX_UPLOAD_BYTES = VOICE_MAX_FILE_SIZE_MB * 1024 * 1024
+VOICE_UPLOAD_CHUNK_SIZE = 64 * 1024
 
+# Keep voice uploads on RAM-backed tmpfs when available (Linux), else default temp dir
+VOICE_TEMP_DIR = "/dev/shm" if os.access("/dev/shm", os.W_OK) else None
 
-def get_chat_service() -> ChatService:
-    """Get chat service instance."""
-    if _chat_service is None:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Chat service not initialized"
-        )
-    return _chat_service
+# Serialized /health bodies keyed by (status, mcp_connected, tools_count)
+_health_bodies: Dict[Tuple[str, bool, int], bytes] = {}
 
 
-def set_chat_service(service: ChatService) -> None:
-    """Set chat service instance."""
-    global _chat_service
-    _chat_service = service
+def _health_response(health_status: str, mcp_connected: bool, tools_count: int) -> Response:
+    """Return a /health response, serializing each distinct state only once."""
+    key = (health_status, mcp_connected, tools_count)
+    body = _health_bodies.get(key)
+    if body is None:
+        body = orjson.dumps(HealthResponse.model_construct(
+            status=health_status,
+            mcp_connected=mcp_connected,
+            tools_count=tools_count
+        ).model_dump())
+        _health_bodies[key] = body
+    return Response(content=body, media_type="application/json")
 
 
 @router.post(
@@ -51,21 +63,20 @@ def set_chat_service(service: ChatService) -> None:
 )
 async def chat(
     request: ChatRequest,
-    api_key: str = Depends(verify_api_key),
-    chat_service: ChatService = Depends(get_chat_service)
+    http_request: Request
 ) -> ChatResponse:
     """
     Process chat message and return AI response.
 
     Args:
         request: Chat request with user_id and message
-        api_key: Validated API key
-        chat_service: Chat service instance
+        http_request: Raw request (chat service is read from app.state)
 
     Returns:
         ChatResponse with assistant's response
     """
-    logger.info(f"Chat request from user {request.user_id}")
+    logger.info("Chat request from user %s", request.user_id)
+    chat_service: ChatService = http_request.app.state.chat_service
 
     try:
         response_text, tool_calls_count, mcp_used = await chat_service.process_message(
@@ -73,14 +84,14 @@ async def chat(
             message=request.message
         )
 
-        return ChatResponse(
+        return ChatResponse.model_construct(
             response=response_text,
             tool_calls_count=tool_calls_count,
             mcp_used=mcp_used
         )
 
     except Exception as e:
-        logger.error(f"Chat processing error: {e}", exc_info=True)
+        log_error_throttled(logger, "User %s: Chat processing error", e, request.user_id)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
@@ -100,34 +111,33 @@ async def chat(
 )
 async def review_pr(
     request: ReviewPRRequest,
-    api_key: str = Depends(verify_api_key),
-    chat_service: ChatService = Depends(get_chat_service)
+    http_request: Request
 ) -> ReviewPRResponse:
     """
     Perform code review for a pull request.
 
     Args:
         request: Review request with PR number
-        api_key: Validated API key
-        chat_service: Chat service instance
+        http_request: Raw request (chat service is read from app.state)
 
     Returns:
         ReviewPRResponse with review text and tool call count
     """
-    logger.info(f"PR review request for #{request.pr_number}")
+    logger.info("PR review request for #%s", request.pr_number)
+    chat_service: ChatService = http_request.app.state.chat_service
 
     try:
         review_text, tool_calls_count = await chat_service.review_pr(
             pr_number=request.pr_number
         )
 
-        return ReviewPRResponse(
+        return ReviewPRResponse.model_construct(
             review=review_text,
             tool_calls_count=tool_calls_count
         )
 
     except Exception as e:
-        logger.error(f"PR review error: {e}", exc_info=True)
+        log_error_throttled(logger, "PR #%s: Review error", e, request.pr_number)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
@@ -140,25 +150,21 @@ async def review_pr(
     summary="Health check",
     description="Check if the server is healthy and MCP is connected."
 )
-async def health_check() -> HealthResponse:
+async def health_check(http_request: Request) -> Response:
     """
     Health check endpoint.
 
+    Args:
+        http_request: Raw request (chat service is read from app.state)
+
     Returns:
         HealthResponse with service status
     """
-    if _chat_service is None:
-        return HealthResponse(
-            status="unhealthy",
-            mcp_connected=False,
-            tools_count=0
-        )
+    chat_service: ChatService = getattr(http_request.app.state, "chat_service", None)
+    if chat_service is None:
+        return _health_response("unhealthy", False, 0)
 
-    return HealthResponse(
-        status="healthy",
-        mcp_connected=True,
-        tools_count=_chat_service.get_tools_count()
-    )
+    return _health_response("healthy", True, chat_service.get_tools_count())
 
 
 @router.get(
@@ -172,23 +178,21 @@ async def health_check() -> HealthResponse:
     description="Retrieve user profile for personalization."
 )
 async def get_profile(
-    user_id: str,
-    api_key: str = Depends(verify_api_key)
+    user_id: str
 ) -> ProfileResponse:
     """
     Get user profile by ID.
 
     Args:
         user_id: User identifier
-        api_key: Validated API key
 
     Returns:
         ProfileResponse with user profile data
     """
-    logger.info(f"Get profile request for user {user_id}")
+    logger.info("Get profile request for user %s", user_id)
 
     profile_manager = get_profile_manager()
-    profile = profile_manager.get_profile(user_id)
+    profile = await asyncio.to_thread(profile_manager.get_profile, user_id)
 
     if not profile:
         raise HTTPException(
@@ -196,9 +200,9 @@ async def get_profile(
             detail=f"Profile not found for user {user_id}"
         )
 
-    return ProfileResponse(
+    return ProfileResponse.model_construct(
         message="Profile retrieved successfully",
-        profile=profile.model_dump(mode="json")
+        profile=profile.model_dump()
     )
 
 
@@ -215,8 +219,7 @@ async def get_profile(
 )
 async def update_profile(
     user_id: str,
-    request: ProfileUpdateRequest,
-    api_key: str = Depends(verify_api_key)
+    request: ProfileUpdateRequest
 ) -> ProfileResponse:
     """
     Update user profile.
@@ -224,20 +227,19 @@ async def update_profile(
     Args:
         user_id: User identifier
         request: Profile update data
-        api_key: Validated API key
 
     Returns:
         ProfileResponse with updated profile
     """
-    logger.info(f"Update profile request for user {user_id}")
+    logger.info("Update profile request for user %s", user_id)
 
     try:
         profile_manager = get_profile_manager()
-        profile = profile_manager.update_profile(user_id, **request.data)
+        profile = await asyncio.to_thread(profile_manager.update_profile, user_id, **request.data)
 
-        return ProfileResponse(
+        return ProfileResponse.model_construct(
             message="Profile updated successfully",
-            profile=profile.model_dump(mode="json")
+            profile=profile.model_dump()
         )
 
     except ValueError as e:
@@ -246,7 +248,7 @@ async def update_profile(
             detail=str(e)
         )
     except Exception as e:
-        logger.error(f"Profile update error: {e}", exc_info=True)
+        logger.error("Profile update error: %s", e, exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
@@ -264,23 +266,21 @@ async def update_profile(
     description="Delete user profile and all associated data (GDPR compliance)."
 )
 async def delete_profile(
-    user_id: str,
-    api_key: str = Depends(verify_api_key)
+    user_id: str
 ) -> ProfileResponse:
     """
     Delete user profile.
 
     Args:
         user_id: User identifier
-        api_key: Validated API key
 
     Returns:
         ProfileResponse with deletion confirmation
     """
-    logger.info(f"Delete profile request for user {user_id}")
+    logger.info("Delete profile request for user %s", user_id)
 
     profile_manager = get_profile_manager()
-    success = profile_manager.delete_profile(user_id)
+    success = await asyncio.to_thread(profile_manager.delete_profile, user_id)
 
     if not success:
         raise HTTPException(
@@ -307,7 +307,6 @@ async def delete_profile(
 async def chat_voice(
     user_id: str = Form(...),
     audio: UploadFile = File(...),
-    api_key: str = Depends(verify_api_key),
     audio_service: AudioService = Depends(get_audio_service)
 ) -> VoiceResponse:
     """
@@ -316,44 +315,64 @@ async def chat_voice(
     Args:
         user_id: User identifier
         audio: Audio file (.oga, .mp3, .wav)
-        api_key: Validated API key
         audio_service: Audio service instance
 
     Returns:
         VoiceResponse with transcription and response
     """
-    logger.info(f"Voice request from user {user_id}, file={audio.filename}, size={audio.size if audio.size else 'unknown'}")
+    logger.info(
+        "Voice request from user %s, file=%s, size=%s",
+        user_id, audio.filename, audio.size or "unknown"
+    )
+
+    size_limit_error = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Audio file exceeds {VOICE_MAX_FILE_SIZE_MB}MB limit"
+    )
 
     # Validate file size (10MB limit)
-    if audio.size and audio.size > 10 * 1024 * 1024:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Audio file exceeds 10MB limit"
-        )
+    if audio.size and audio.size > VOICE_MAX_UPLOAD_BYTES:
+        raise size_limit_error
 
-    try:
-        # Read audio bytes
-        audio_bytes = await audio.read()
+    # Determine audio format from filename
+    audio_format = "oga"
+    if audio.filename:
+        ext = audio.filename.split('.')[-1].lower()
+        if ext in ["mp3", "wav", "oga", "ogg"]:
+            audio_format = ext
 
-        # Determine audio format from filename
-        audio_format = "oga"
-        if audio.filename:
-            ext = audio.filename.split('.')[-1].lower()
-            if ext in ["mp3", "wav", "oga", "ogg"]:
-                audio_format = ext
+    audio_path = None
+    try:
+        # Stream the upload to a temp file instead of buffering it in memory
+        with tempfile.NamedTemporaryFile(delete=False, suffix=f".{audio_format}", dir=VOICE_TEMP_DIR) as temp_input:
+            audio_path = temp_input.name
+            bytes_written = 0
+            while chunk := await audio.read(VOICE_UPLOAD_CHUNK_SIZE):
+                bytes_written += len(chunk)
+                if bytes_written > VOICE_MAX_UPLOAD_BYTES:
+                    raise size_limit_error
+                temp_input.write(chunk)
 
         # Process voice message
         result = await audio_service.process_voice_message(
             user_id=user_id,
-            audio_bytes=audio_bytes,
+            audio_path=audio_path,
             audio_format=audio_format
         )
 
-        return VoiceResponse(**result)
+        return VoiceResponse.model_construct(**result)
 
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Voice processing error: {e}", exc_info=True)
+        log_error_throttled(logger, "User %s: Voice processing error", e, user_id)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Audio processing failed: {str(e)}"
         )
+    finally:
+        if audio_path and os.path.exists(audio_path):
+            try:
+                os.remove(audio_path)
+            except OSError as e:
+                logger.warning("Failed to cleanup %s: %s", audio_path, e)
@@ -1,25 +1,44 @@
 """Audio processing service for voice messages."""
 
 import asyncio
-import json
+import hashlib
+import io
 import logging
 import os
-import subprocess
-import tempfile
 import time
 from pathlib import Path
-from typing import Dict, Optional
-from collections import defaultdict
+from typing import Dict, Optional, Tuple
+from collections import OrderedDict
 
-from fastapi import HTTPException
+import av
+from fastapi import HTTPException, Request
 
-from conversation import ConversationManager
+from logger import log_error_throttled
 from openrouter_client import OpenRouterClient
-from profile_manager import get_profile_manager
-from config import MCP_USED_INDICATOR
+from config import (
+    OPENROUTER_AUDIO_MODEL,
+    VOICE_CACHE_ENABLED,
+    VOICE_CACHE_MAX_ENTRIES,
+    VOICE_CACHE_TTL_SEC,
+    VOICE_USER_LOCKS_MAX,
+)
 
 logger = logging.getLogger(__name__)
 
+# System prompt for audio transcription/summary (shared, never mutated)
+_AUDIO_PROMPT_RU = {
+    "role": "system",
+    "content": """You are a voice message transcription assistant.
+
+Your task is to:
+1. Listen to the user's voice message
+2. Transcribe it accurately
+3. Create a brief summary of the main question or request
+
+Respond ONLY with the transcribed text or a brief summary of what the user asked.
+Be concise and clear. Use Russian language."""
+}
+
 
 class AudioService:
     """Service for processing voice messages with two-stage processing:
@@ -27,29 +46,38 @@ class AudioService:
     2. Text model (via chat_service) - response generation with MCP tools
     """
 
-    def __init__(self, mcp_manager=None):
+    def __init__(self, mcp_manager=None, chat_service=None):
         logger.info("Initializing AudioService...")
 
         try:
-            self.conversation_manager = ConversationManager()
-            logger.info("ConversationManager initialized")
+            self.chat_service = chat_service
 
-            self.openrouter_client = OpenRouterClient()
+            # Share the chat service's connection pool when available
+            if chat_service is not None:
+                self.openrouter_client = chat_service.openrouter_client
+            else:
+                self.openrouter_client = OpenRouterClient()
             logger.info("OpenRouterClient initialized")
 
+            # Transcriptions of recently seen clips: key -> (expires_at, transcription)
+            self._transcription_cache: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+            self._inflight_transcriptions: Dict[str, asyncio.Future] = {}  # key -> pending transcription
+
             # Per-user locks for sequential processing (FIFO)
-            self.user_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+            self.user_locks: "OrderedDict[str, asyncio.Lock]" = OrderedDict()
+            # Requests holding or waiting on each user's lock; only users at 0 are evicted
+            self._user_lock_refs: Dict[str, int] = {}
             logger.info("User locks initialized")
 
             logger.info("AudioService initialization complete (two-stage processing: audio → text)")
         except Exception as e:
-            logger.error(f"AudioService initialization failed: {e}", exc_info=True)
+            logger.error("AudioService initialization failed: %s", e, exc_info=True)
             raise
 
     async def process_voice_message(
         self,
         user_id: str,
-        audio_bytes: bytes,
+        audio_path: str,
         audio_format: str = "oga"
     ) -> Dict:
         """
@@ -57,100 +85,148 @@ class AudioService:
 
         Args:
             user_id: User identifier
-            audio_bytes: Audio file bytes
+            audio_path: Path to the uploaded audio file (owned by the caller)
             audio_format: Audio format (oga, mp3, wav)
 
         Returns:
             Dict with transcription, response, latency_ms, audio_tokens, cost_usd
         """
-        start_time = time.time()
+        start_ns = time.monotonic_ns()
+
+        # Stage 1 (audio model) starts right away; only stage 2, which reads and
+        # writes the user's conversation, waits for the user's FIFO lock
+        transcription = asyncio.ensure_future(self._get_transcription(user_id, audio_path, audio_format))
+        lock = self._lock_for(user_id)
+        self._user_lock_refs[user_id] = self._user_lock_refs.get(user_id, 0) + 1
+        try:
+            async with lock:
+                return await self._process_voice_internal(user_id, transcription, start_ns)
+        finally:
+            refs = self._user_lock_refs[user_id] - 1
+            if refs:
+                self._user_lock_refs[user_id] = refs
+            else:
+                del self._user_lock_refs[user_id]
+
+            # Stage 2 may fail before awaiting the transcription: cancel it if
+            # still running, otherwise retrieve its exception so it isn't
+            # reported as never retrieved
+            if not transcription.done():
+                transcription.cancel()
+            elif not transcription.cancelled():
+                transcription.exception()
+
+    def _lock_for(self, user_id: str) -> asyncio.Lock:
+        """
+        Get or create the user's lock, keeping at most VOICE_USER_LOCKS_MAX.
 
-        # Use user-specific lock to ensure FIFO processing
-        async with self.user_locks[user_id]:
-            return await self._process_voice_internal(user_id, audio_bytes, audio_format, start_time)
+        Least recently used locks are evicted only while no request holds or
+        waits on them (tracked in _user_lock_refs, since locked() is False
+        right after release() even while waiters are queued).
+        """
+        lock = self.user_locks.get(user_id)
+        if lock is None:
+            # Evict from the LRU end before adding, so the new lock is never a
+            # candidate; locks in use are treated as recently used
+            for _ in range(len(self.user_locks)):
+                if len(self.user_locks) < VOICE_USER_LOCKS_MAX:
+                    break
+                oldest_user, oldest_lock = next(iter(self.user_locks.items()))
+                if oldest_lock.locked() or self._user_lock_refs.get(oldest_user):
+                    self.user_locks.move_to_end(oldest_user)
+                else:
+                    del self.user_locks[oldest_user]
+            lock = asyncio.Lock()
+            self.user_locks[user_id] = lock
+        else:
+            self.user_locks.move_to_end(user_id)
+        return lock
+
+    async def _get_transcription(
+        self,
+        user_id: str,
+        audio_path: str,
+        audio_format: str
+    ) -> Tuple[Optional[str], int, bool]:
+        """
+        Get transcription for a clip, from cache, an in-flight request or the audio model.
+
+        Returns:
+            Tuple of (transcription, audio_tokens, cache_hit)
+        """
+        # Step 1: Input audio is already on disk
+        logger.info("User %s: Audio received at %s (%d bytes)", user_id, audio_path, os.path.getsize(audio_path))
+
+        language = "ru"
+
+        # Step 2: Reuse the transcription of an identical clip if cached
+        if not VOICE_CACHE_ENABLED:
+            audio_response, audio_tokens = await self._transcribe(user_id, audio_path, audio_format, language)
+            return audio_response, audio_tokens, False
+
+        cache_key = await asyncio.to_thread(self._transcription_cache_key, audio_path, language)
+        audio_response = self._get_cached_transcription(cache_key)
+        if audio_response is not None:
+            logger.info("User %s: Step 1/2 - Audio transcription (cache hit)", user_id)
+            return audio_response, 0, True
+
+        # Steps 3-5: identical clips in flight share one audio model call
+        task = self._inflight_transcriptions.get(cache_key)
+        if task is not None:
+            logger.info("User %s: Step 1/2 - Audio transcription (joined in-flight request)", user_id)
+            audio_response, _ = await asyncio.shield(task)
+            return audio_response, 0, True
+
+        task = asyncio.ensure_future(self._transcribe(user_id, audio_path, audio_format, language))
+        self._inflight_transcriptions[cache_key] = task
+        task.add_done_callback(lambda _: self._inflight_transcriptions.pop(cache_key, None))
+        audio_response, audio_tokens = await asyncio.shield(task)
+        if audio_response:
+            self._cache_transcription(cache_key, audio_response)
+        return audio_response, audio_tokens, False
 
     async def _process_voice_internal(
         self,
         user_id: str,
-        audio_bytes: bytes,
-        audio_format: str,
-        start_time: float
+        transcription: "asyncio.Future[Tuple[Optional[str], int, bool]]",
+        start_ns: int
     ) -> Dict:
-        """Internal processing with temp file management."""
-        temp_input_path = None
-        temp_output_path = None
+        """Stage 2: answer the transcription with the text model (runs under the user's lock)."""
         error_type = None
 
         try:
-            # Step 1: Save input audio to temp file
-            with tempfile.NamedTemporaryFile(delete=False, suffix=f".{audio_format}") as temp_input:
-                temp_input.write(audio_bytes)
-                temp_input_path = temp_input.name
-
-            logger.info(f"User {user_id}: Audio saved to {temp_input_path} ({len(audio_bytes)} bytes)")
-
-            # Step 2: Convert to .mp3 if needed
-            if audio_format != "mp3":
-                temp_output_path = tempfile.mktemp(suffix=".mp3")
-                await self._convert_audio_to_mp3(temp_input_path, temp_output_path)
-                audio_file_path = temp_output_path
-            else:
-                audio_file_path = temp_input_path
-
-            logger.info(f"User {user_id}: Audio ready at {audio_file_path}")
-
-            # Step 3: Get conversation history
-            conversation_history = self.conversation_manager.get_history(user_id)
-
-            # Step 4: Truncate history if too large (keep last 20 messages)
-            if len(conversation_history) > 20:
-                conversation_history = conversation_history[-20:]
-                logger.info(f"User {user_id}: Truncated history to 20 messages")
-
-            # Step 5: Get transcription from audio model (NO tools)
-            logger.info(f"User {user_id}: Step 1/2 - Audio transcription")
-            audio_prompt = self._build_audio_transcription_prompt()
-
-            _, audio_response, audio_tokens, _ = await self.openrouter_client.audio_completion(
-                messages=[audio_prompt] + conversation_history,
-                audio_file_path=audio_file_path,
-                language="ru",
-                tools=None,  # NO tools for audio model
-                tool_choice=None
-            )
+            audio_response, audio_tokens, cache_hit = await transcription
 
             if not audio_response:
-                logger.error(f"User {user_id}: Audio transcription failed")
+                logger.error("User %s: Audio transcription failed", user_id)
                 return {
                     "transcription": None,
                     "response": "Извините, не удалось распознать голосовое сообщение.",
-                    "latency_ms": int((time.time() - start_time) * 1000),
+                    "latency_ms": (time.monotonic_ns() - start_ns) // 1_000_000,
                     "audio_tokens": audio_tokens,
                     "cost_usd": self._calculate_cost(audio_tokens)
                 }
 
-            logger.info(f"User {user_id}: Transcription (from audio model): {audio_response[:100]}...")
+            logger.info("User %s: Transcription (from audio model): %.100s...", user_id, audio_response)
 
             # Step 6: Process transcription with text model + MCP tools
-            logger.info(f"User {user_id}: Step 2/2 - Text processing with MCP tools")
-
-            # Import here to avoid circular dependency
-            from app import get_chat_service
+            logger.info("User %s: Step 2/2 - Text processing with MCP tools", user_id)
 
-            chat_service = get_chat_service()
-            final_response, tool_calls_count, mcp_was_used = await chat_service.process_message(
+            final_response, tool_calls_count, mcp_was_used = await self.chat_service.process_message(
                 user_id=user_id,
                 message=audio_response
             )
 
             # Step 7: Calculate metrics
-            latency_ms = int((time.time() - start_time) * 1000)
+            latency_ms = (time.monotonic_ns() - start_ns) // 1_000_000
             cost_usd = self._calculate_cost(audio_tokens)
 
             logger.info(
-                f"METRIC: voice_processing user_id={user_id} latency_ms={latency_ms} "
-                f"audio_tokens={audio_tokens} cost_usd={cost_usd:.6f} tool_calls={tool_calls_count} "
-                f"mcp_used={mcp_was_used} error=none"
+                "METRIC: voice_processing user_id=%s latency_ms=%d "
+                "audio_tokens=%d cost_usd=%.6f tool_calls=%d "
+                "mcp_used=%s cache_hit=%s error=none",
+                user_id, latency_ms, audio_tokens, cost_usd, tool_calls_count,
+                mcp_was_used, cache_hit
             )
 
             return {
@@ -163,72 +239,115 @@ class AudioService:
 
         except Exception as e:
             error_type = type(e).__name__
-            latency_ms = int((time.time() - start_time) * 1000)
+            latency_ms = (time.monotonic_ns() - start_ns) // 1_000_000
 
-            logger.error(f"User {user_id}: Audio processing error: {e}", exc_info=True)
+            log_error_throttled(logger, "User %s: Audio processing error", e, user_id)
             logger.info(
-                f"METRIC: voice_processing user_id={user_id} latency_ms={latency_ms} "
-                f"audio_tokens=0 cost_usd=0.0 error={error_type}"
+                "METRIC: voice_processing user_id=%s latency_ms=%d "
+                "audio_tokens=0 cost_usd=0.0 error=%s",
+                user_id, latency_ms, error_type
             )
             raise
 
-        finally:
-            # Cleanup temp files
-            if temp_input_path and os.path.exists(temp_input_path):
-                try:
-                    os.remove(temp_input_path)
-                    logger.debug(f"Cleaned up temp file: {temp_input_path}")
-                except Exception as e:
-                    logger.warning(f"Failed to cleanup {temp_input_path}: {e}")
-
-            if temp_output_path and os.path.exists(temp_output_path):
-                try:
-                    os.remove(temp_output_path)
-                    logger.debug(f"Cleaned up temp file: {temp_output_path}")
-                except Exception as e:
-                    logger.warning(f"Failed to cleanup {temp_output_path}: {e}")
-
-    async def _convert_audio_to_mp3(self, input_path: str, output_path: str) -> None:
-        """Convert audio file to MP3 using ffmpeg."""
-        logger.info(f"Converting {input_path} -> {output_path}")
-
-        # Run ffmpeg in subprocess
-        process = await asyncio.create_subprocess_exec(
-            "ffmpeg",
-            "-i", input_path,
-            "-acodec", "libmp3lame",
-            "-ar", "16000",  # 16kHz sample rate (optimal for speech)
-            "-ac", "1",  # Mono
-            "-b:a", "32k",  # 32 kbps bitrate (sufficient for speech)
-            "-y",  # Overwrite output
-            output_path,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-
-        stdout, stderr = await process.communicate()
+    async def _transcribe(
+        self,
+        user_id: str,
+        audio_path: str,
+        audio_format: str,
+        language: str
+    ) -> Tuple[Optional[str], int]:
+        """
+        Convert audio and get its transcription from the audio model.
 
-        if process.returncode != 0:
-            error_msg = stderr.decode() if stderr else "Unknown ffmpeg error"
-            logger.error(f"ffmpeg error: {error_msg}")
-            raise RuntimeError(f"Audio conversion failed: {error_msg}")
+        Returns:
+            Tuple of (transcription, audio_tokens)
+        """
+        # Steps 3-4: Convert to .mp3 in memory (if needed)
+        if audio_format != "mp3":
+            audio_bytes = await asyncio.to_thread(self._convert_audio_to_mp3, audio_path)
+        else:
+            audio_bytes = await asyncio.to_thread(Path(audio_path).read_bytes)
+
+        logger.info("User %s: Audio ready (%d bytes mp3)", user_id, len(audio_bytes))
+
+        # Step 5: Get transcription from audio model (NO tools). The transcription
+        # depends only on the clip, which is what the transcription cache keys on;
+        # conversation context is applied by the text model in stage 2
+        logger.info("User %s: Step 1/2 - Audio transcription", user_id)
+        _, audio_response, audio_tokens, _ = await self.openrouter_client.audio_completion(
+            messages=[_AUDIO_PROMPT_RU],
+            audio_bytes=audio_bytes,
+            language=language,
+            tools=None,  # NO tools for audio model
+            tool_choice=None
+        )
+        return audio_response, audio_tokens
+
+    @staticmethod
+    def _transcription_cache_key(audio_path: str, language: str) -> str:
+        """Hash the raw clip together with language and audio model (blocking)."""
+        digest = hashlib.blake2b(digest_size=16)
+        with open(audio_path, "rb") as audio_file:
+            for chunk in iter(lambda: audio_file.read(64 * 1024), b""):
+                digest.update(chunk)
+        return f"{OPENROUTER_AUDIO_MODEL}:{language}:{digest.hexdigest()}"
+
+    def _get_cached_transcription(self, key: str) -> Optional[str]:
+        """Return a cached transcription, or None if missing or expired."""
+        cached = self._transcription_cache.get(key)
+        if cached is None:
+            return None
+        expires_at, transcription = cached
+        if expires_at <= time.monotonic():
+            del self._transcription_cache[key]
+            return None
+        self._transcription_cache.move_to_end(key)
+        return transcription
+
+    def _cache_transcription(self, key: str, transcription: str) -> None:
+        """Store a transcription, evicting the least recently used entries."""
+        self._transcription_cache[key] = (time.monotonic() + VOICE_CACHE_TTL_SEC, transcription)
+        self._transcription_cache.move_to_end(key)
+        while len(self._transcription_cache) > VOICE_CACHE_MAX_ENTRIES:
+            self._transcription_cache.popitem(last=False)
+
+    def _convert_audio_to_mp3(self, input_path: str) -> bytes:
+        """
+        Convert audio file to 16 kHz mono MP3 in memory using PyAV.
 
-        logger.info(f"Audio converted successfully: {output_path}")
+        Blocking; run it in a worker thread.
 
-    def _build_audio_transcription_prompt(self) -> Dict:
-        """Build system prompt for audio transcription/summary."""
-        return {
-            "role": "system",
-            "content": """You are a voice message transcription assistant.
+        Args:
+            input_path: Path to source audio file
 
-Your task is to:
-1. Listen to the user's voice message
-2. Transcribe it accurately
-3. Create a brief summary of the main question or request
+        Returns:
+            MP3-encoded audio bytes
+        """
+        logger.info("Converting %s -> mp3", input_path)
 
-Respond ONLY with the transcribed text or a brief summary of what the user asked.
-Be concise and clear. Use Russian language."""
-        }
+        output = io.BytesIO()
+        try:
+            with av.open(input_path) as source, av.open(output, "w", format="mp3") as target:
+                stream = target.add_stream("libmp3lame", rate=16000)  # 16kHz (optimal for speech)
+                stream.layout = "mono"
+                stream.bit_rate = 32000  # 32 kbps (sufficient for speech)
+                resampler = av.AudioResampler(format="s16p", layout="mono", rate=16000)
+
+                for frame in source.decode(audio=0):
+                    for resampled in resampler.resample(frame):
+                        target.mux(stream.encode(resampled))
+
+                # Flush resampler and encoder
+                for resampled in resampler.resample(None):
+                    target.mux(stream.encode(resampled))
+                target.mux(stream.encode(None))
+        except av.FFmpegError as e:
+            logger.error("Audio decode/encode error: %s", e)
+            raise RuntimeError(f"Audio conversion failed: {e}")
+
+        audio_bytes = output.getvalue()
+        logger.info("Audio converted successfully: %d bytes", len(audio_bytes))
+        return audio_bytes
 
     def _calculate_cost(self, audio_tokens: int) -> float:
         """Calculate cost in USD based on audio tokens."""
@@ -237,21 +356,12 @@ Be concise and clear. Use Russian language."""
         return audio_tokens * cost_per_token
 
 
-# Global service instance (initialized in main.py)
-_audio_service: Optional[AudioService] = None
-
-
-def get_audio_service() -> Optional[AudioService]:
-    """Get audio service instance."""
-    if _audio_service is None:
+def get_audio_service(request: Request) -> AudioService:
+    """Get audio service instance (set on app.state during startup)."""
+    audio_service = getattr(request.app.state, "audio_service", None)
+    if audio_service is None:
         raise HTTPException(
             status_code=503,
             detail="Voice input service not available"
         )
-    return _audio_service
-
-
-def set_audio_service(service: AudioService) -> None:
-    """Set audio service instance."""
-    global _audio_service
-    _audio_service = service
+    return audio_service
@@ -1,38 +1,64 @@
 """Authentication middleware for API key verification."""
 
+import hmac
 import logging
-from fastapi import Header, HTTPException, status
+
+from fastapi import status
+from fastapi.responses import JSONResponse
 
 from config import BACKEND_API_KEY
 
 logger = logging.getLogger(__name__)
 
+# Only API routes require a key; /health and the OpenAPI docs stay public
+PROTECTED_PATH_PREFIX = "/api/"
+
 
-async def verify_api_key(x_api_key: str = Header(..., alias="X-API-Key")) -> str:
+class APIKeyMiddleware:
     """
-    Verify API key from request header.
+    ASGI middleware that verifies the X-API-Key header before routing.
 
-    Args:
-        x_api_key: API key from X-API-Key header
+    Runs once per request instead of going through FastAPI's dependency
+    resolution on every endpoint.
+    """
 
-    Returns:
-        Validated API key
+    def __init__(self, app):
+        """
+        Initialize middleware.
 
-    Raises:
-        HTTPException: If API key is invalid
-    """
-    if not x_api_key:
-        logger.warning("Missing API key in request")
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Missing API key"
-        )
-
-    if x_api_key != BACKEND_API_KEY:
-        logger.warning("Invalid API key attempt")
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid API key"
-        )
-
-    return x_api_key
+        Args:
+            app: Wrapped ASGI application
+        """
+        self.app = app
+        self._expected_key = BACKEND_API_KEY.encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(PROTECTED_PATH_PREFIX):
+            await self.app(scope, receive, send)
+            return
+
+        x_api_key = None
+        for name, value in scope["headers"]:
+            if name == b"x-api-key":
+                x_api_key = value
+                break
+
+        if not x_api_key:
+            logger.warning("Missing API key in request")
+            response = JSONResponse(
+                {"detail": "Missing API key"},
+                status_code=status.HTTP_401_UNAUTHORIZED
+            )
+            await response(scope, receive, send)
+            return
+
+        if not hmac.compare_digest(x_api_key, self._expected_key):
+            logger.warning("Invalid API key attempt")
+            response = JSONResponse(
+                {"detail": "Invalid API key"},
+                status_code=status.HTTP_401_UNAUTHORIZED
+            )
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
@@ -1,19 +1,75 @@
 """Chat service for processing messages with OpenRouter and MCP tools."""
 
-import json
+import asyncio
+import functools
 import logging
-from datetime import datetime
-from typing import Optional, Tuple
-
-from config import ESSENTIAL_TOOLS, MCP_USED_INDICATOR
+import time
+from collections import OrderedDict
+from datetime import datetime, time as dt_time, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import orjson
+
+from config import (
+    CACHEABLE_TOOLS,
+    ESSENTIAL_TOOLS,
+    MAX_CONCURRENT_CHATS,
+    MCP_USED_INDICATOR,
+    REVIEW_REF_MIN_CHARS,
+    REVIEW_REF_PREVIEW_CHARS,
+    REVIEW_REF_TOOLS,
+    TOOL_CACHE_ENABLED,
+    TOOL_CACHE_MAX_ENTRIES,
+    TOOL_CACHE_TTL_SEC,
+)
 from conversation import ConversationManager
 from openrouter_client import OpenRouterClient
 from mcp_manager import MCPManager
-from prompts import get_pr_review_prompt
+from prompts import REVIEW_VERDICT_HEADING, get_chat_system_prompt, get_pr_review_prompt
 from profile_manager import get_profile_manager
 
 logger = logging.getLogger(__name__)
 
+_MCP_USED_INDICATOR_LEN = len(MCP_USED_INDICATOR)
+
+# Local tool offered during PR review to read back a result shortened to a ref stub
+RESOLVE_REF_TOOL_NAME = "resolve_ref"
+_RESOLVE_REF_TOOL = {
+    "type": "function",
+    "function": {
+        "name": RESOLVE_REF_TOOL_NAME,
+        "description": "Return the full content of an earlier tool result that was shortened to a ref stub.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "ref": {"type": "string", "description": "The ref value from the stub"}
+            },
+            "required": ["ref"]
+        }
+    }
+}
+
+# Today's date for prompts, recomputed only after local midnight
+_today_str = ""
+_today_expires_at = 0.0
+
+
+def _today() -> str:
+    """Return the current local date as YYYY-MM-DD, cached until midnight."""
+    global _today_str, _today_expires_at
+    if time.time() >= _today_expires_at:
+        now = datetime.now()
+        _today_str = now.strftime("%Y-%m-%d")
+        _today_expires_at = datetime.combine(now.date() + timedelta(days=1), dt_time.min).timestamp()
+    return _today_str
+
+
+def _review_tool_choice(iteration: int, is_last_iteration: bool) -> Optional[str]:
+    """Force a tool call on the first review iteration, none on the last."""
+    if iteration == 1:
+        return "required"
+    return None if is_last_iteration else "auto"
+
 
 class ChatService:
     """Service for handling chat requests with MCP tool integration."""
@@ -23,6 +79,12 @@ class ChatService:
         self.conversation_manager = ConversationManager()
         self.openrouter_client = OpenRouterClient()
         self.openrouter_tools = []
+        self._processing_semaphore = asyncio.Semaphore(MAX_CONCURRENT_CHATS)
+
+        # Results of deterministic tools: key -> (expires_at, result content)
+        self._tool_cache: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._inflight_tool_calls: Dict[str, asyncio.Future] = {}  # key -> pending MCP call
+        self._inflight_messages: Dict[Tuple[str, str], asyncio.Future] = {}  # (user, text) -> pending answer
 
     def initialize(self) -> None:
         """Initialize service with MCP tools."""
@@ -33,16 +95,16 @@ class ChatService:
         mcp_tools = self.mcp_manager.get_tools()
 
         # Log all available tools from MCP
-        logger.info(f"=== ALL MCP TOOLS ({len(mcp_tools)}) ===")
+        logger.info("=== ALL MCP TOOLS (%d) ===", len(mcp_tools))
         for tool in mcp_tools:
-            logger.info(f"  - {tool['name']}: {tool.get('description', '')[:80]}...")
+            logger.info("  - %s: %.80s...", tool['name'], tool.get('description', ''))
 
         # Filter to essential tools only to reduce token usage
         filtered_tools = [t for t in mcp_tools if t["name"] in ESSENTIAL_TOOLS]
-        logger.info(f"Filtered tools: {len(filtered_tools)}/{len(mcp_tools)} (saved ~{(len(mcp_tools) - len(filtered_tools)) * 60} tokens)")
+        logger.info("Filtered tools: %d/%d (saved ~%d tokens)", len(filtered_tools), len(mcp_tools), (len(mcp_tools) - len(filtered_tools)) * 60)
 
         self.openrouter_tools = self.openrouter_client.convert_mcp_tools_to_openrouter(filtered_tools)
-        logger.info(f"Chat service initialized with {len(self.openrouter_tools)} tools")
+        logger.info("Chat service initialized with %d tools", len(self.openrouter_tools))
 
     async def process_message(self, user_id: str, message: str) -> Tuple[str, int, bool]:
         """
@@ -55,57 +117,52 @@ class ChatService:
         Returns:
             Tuple of (response_text, tool_calls_count, mcp_was_used)
         """
-        logger.info(f"User {user_id}: Processing message: {message[:100]}...")
+        # A retried request (same user, same text) joins the one still running
+        # instead of adding the message to history and running the tool loop again
+        key = (user_id, message)
+        task = self._inflight_messages.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._process_message(user_id, message))
+            self._inflight_messages[key] = task
+            task.add_done_callback(lambda _: self._inflight_messages.pop(key, None))
+        else:
+            logger.info("User %s: Joining in-flight request for the same message", user_id)
+        return await asyncio.shield(task)
+
+    async def _process_message(self, user_id: str, message: str) -> Tuple[str, int, bool]:
+        """Add the message to history, run the tool loop and store the answer."""
+        logger.info("User %s: Processing message: %.100s...", user_id, message)
 
         # Check and clear history if full
         if self.conversation_manager.check_and_clear_if_full(user_id):
-            logger.info(f"User {user_id}: History cleared (reached limit)")
+            logger.info("User %s: History cleared (reached limit)", user_id)
 
         # Add user message to history
         self.conversation_manager.add_message(user_id, "user", message)
 
-        # Process with OpenRouter
-        response_text, tool_calls_count, mcp_was_used = await self._process_with_openrouter(user_id)
+        # Process with OpenRouter (bounded number of concurrent LLM conversations)
+        async with self._processing_semaphore:
+            response_text, tool_calls_count, mcp_was_used = await self._process_with_openrouter(user_id)
 
         if response_text:
-            # Clean response for storage (remove indicator)
-            clean_response = response_text.replace(MCP_USED_INDICATOR, "").strip()
+            # Clean response for storage (remove indicator, which is appended at the end)
+            if response_text.endswith(MCP_USED_INDICATOR):
+                clean_response = response_text[:-_MCP_USED_INDICATOR_LEN].strip()
+            else:
+                clean_response = response_text.replace(MCP_USED_INDICATOR, "").strip()
             self.conversation_manager.add_message(user_id, "assistant", clean_response)
 
         return response_text or "Sorry, something went wrong.", tool_calls_count, mcp_was_used
 
     async def _process_with_openrouter(self, user_id: str) -> Tuple[Optional[str], int, bool]:
         """Process message with OpenRouter and MCP tools."""
-        conversation_history = self.conversation_manager.get_history(user_id)
-        current_date = datetime.now().strftime("%Y-%m-%d")
-
-        # Build base system prompt
-        base_content = f"""Current date: {current_date}.
-
-You are a project consultant for EasyPomodoro Android app (repo: LebedAlIv2601/EasyPomodoro).
+        current_date = _today()
 
-**CRITICAL RULES:**
-- NEVER say "let me look at..." or "I will check..." - just CALL the tool immediately
-- If you need information, CALL a tool. Do NOT describe your intention.
-- Do NOT respond until you have ALL the information needed to give a COMPLETE answer
-- You can call multiple tools in sequence - keep calling until you have everything
+        base_content = get_chat_system_prompt(current_date)
 
-**TOOLS:**
-1. **get_project_structure** - Get directory tree. USE FIRST to find file paths!
-2. **get_file_contents** - Read file content (owner="LebedAlIv2601", repo="EasyPomodoro", path="...")
-3. **rag_query** - Search project documentation semantically
-4. **list_commits**, **list_issues**, **list_pull_requests** - GitHub items
-
-**WORKFLOW:**
-1. For code questions: get_project_structure -> get_file_contents (repeat as needed)
-2. For architecture/design: rag_query
-3. ONLY respond with final answer AFTER gathering ALL necessary information
-
-Respond in user's language."""
-
-        # Add personalization context if profile exists
+        # Add personalization context if profile exists (file I/O, keep it off the event loop)
         profile_manager = get_profile_manager()
-        profile_context = profile_manager.build_context(user_id)
+        profile_context = await asyncio.to_thread(profile_manager.build_context, user_id)
         if profile_context:
             base_content += "\n\n" + profile_context
 
@@ -114,114 +171,274 @@ Respond in user's language."""
             "content": base_content
         }
 
-        messages_with_system = [system_prompt] + conversation_history
-        mcp_was_used = False
-        total_tool_calls = 0
+        messages = [system_prompt, *self.conversation_manager.get_history(user_id)]
+        tools = self.openrouter_tools or None
+        tool_choice = "auto" if tools else None
+
+        response_text, total_tool_calls, error = await self._run_tool_loop(
+            messages,
+            log_prefix=f"User {user_id}",
+            max_iterations=10,
+            tools=tools,
+            tool_choice_for=lambda iteration, is_last: None if is_last else tool_choice,
+            exec_tool=functools.partial(self._exec_tool, f"User {user_id}"),
+            final_answer_prompt="Based on all the information gathered above, provide a complete answer now."
+        )
+        if error is not None:
+            return None, 0, False
 
-        tool_choice = "auto" if self.openrouter_tools else None
+        mcp_was_used = total_tool_calls > 0
+        if response_text and mcp_was_used:
+            response_text += MCP_USED_INDICATOR
+
+        return response_text, total_tool_calls, mcp_was_used
+
+    async def _run_tool_loop(
+        self,
+        messages: List[Dict[str, Any]],
+        log_prefix: str,
+        max_iterations: int,
+        tools: Optional[List[Dict[str, Any]]],
+        tool_choice_for: Callable[[int, bool], Optional[str]],
+        exec_tool: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+        final_answer_prompt: str,
+        is_complete: Optional[Callable[[str], bool]] = None,
+        before_tool_round: Optional[Callable[[List[Dict[str, Any]]], None]] = None
+    ) -> Tuple[Optional[str], int, Optional[Exception]]:
+        """
+        Run the model <-> tool loop shared by chat and PR review.
 
-        try:
-            max_iterations = 10
-            iteration = 0
-            current_messages = messages_with_system
-            response_text = None
+        Tools are disabled on the last iteration to force a final answer.
 
-            while iteration < max_iterations:
-                iteration += 1
-                logger.info(f"User {user_id}: Tool call iteration {iteration}/{max_iterations}")
+        Args:
+            messages: Conversation to send; extended in place with tool rounds
+            log_prefix: Prefix for log lines (user or PR being processed)
+            max_iterations: Maximum number of model calls with tools
+            tools: Tools in OpenRouter format, or None
+            tool_choice_for: Returns tool_choice for (iteration, is_last_iteration)
+            exec_tool: Executes one tool call and returns its tool message
+            final_answer_prompt: Sent when the model stops calling tools but returns no text
+            is_complete: Returns True if a response is final even though it has tool calls
+            before_tool_round: Called with messages before each round of tool calls
 
-                # On last iteration, disable tools to force final response
-                is_last_iteration = (iteration == max_iterations)
-                current_tools = None if is_last_iteration else self.openrouter_tools
-                current_tool_choice = None if is_last_iteration else tool_choice
+        Returns:
+            Tuple of (response_text, total_tool_calls, error); error is the exception
+            that stopped the loop, already logged
+        """
+        total_tool_calls = 0
+        response_text = None
+
+        try:
+            for iteration in range(1, max_iterations + 1):
+                logger.info("%s: Tool call iteration %d/%d", log_prefix, iteration, max_iterations)
 
+                is_last_iteration = (iteration == max_iterations)
                 response_text, tool_calls = await self.openrouter_client.chat_completion(
-                    messages=current_messages,
-                    tools=current_tools if current_tools else None,
-                    tool_choice=current_tool_choice
+                    messages=messages,
+                    tools=None if is_last_iteration else tools,
+                    tool_choice=tool_choice_for(iteration, is_last_iteration)
                 )
 
+                if tool_calls and response_text and is_complete and is_complete(response_text):
+                    # Final answer already written; extra tool calls would only cost another round
+                    logger.info("%s: Response complete, skipping %d tool calls", log_prefix, len(tool_calls))
+                    break
+
                 if not tool_calls:
                     # No tool calls - this should be the final response
-                    logger.info(f"User {user_id}: No tool calls in iteration {iteration}")
+                    logger.info("%s: No tool calls in iteration %d", log_prefix, iteration)
 
                     # If model returned empty response, force it to generate one
                     if not response_text:
-                        logger.info(f"User {user_id}: Empty response, forcing final answer")
-                        # Add instruction to generate final answer
-                        current_messages.append({
-                            "role": "user",
-                            "content": "Based on all the information gathered above, provide a complete answer now."
-                        })
+                        logger.info("%s: Empty response, forcing final answer", log_prefix)
+                        messages.append({"role": "user", "content": final_answer_prompt})
                         response_text, _ = await self.openrouter_client.chat_completion(
-                            messages=current_messages,
+                            messages=messages,
                             tools=None,
                             tool_choice=None
                         )
                     break
 
-                logger.info(f"User {user_id}: Processing {len(tool_calls)} tool calls")
-                mcp_was_used = True
+                logger.info("%s: Processing %d tool calls", log_prefix, len(tool_calls))
                 total_tool_calls += len(tool_calls)
 
-                tool_results = []
-                for tool_call in tool_calls:
-                    tool_name = tool_call["name"]
-                    tool_args = tool_call["arguments"]
-
-                    logger.info(f"User {user_id}: Executing tool {tool_name}")
-
-                    try:
-                        result = await self.mcp_manager.call_tool(tool_name, tool_args)
-                        result_content = result["result"]
-
-                        try:
-                            parsed_result = json.loads(result_content)
-                            if isinstance(parsed_result, dict) and "error" in parsed_result:
-                                logger.error(f"User {user_id}: MCP tool returned error: {parsed_result['error']}")
-                        except (json.JSONDecodeError, ValueError):
-                            pass
-
-                        tool_results.append({
-                            "role": "tool",
-                            "tool_call_id": tool_call["id"],
-                            "content": result_content
-                        })
-                    except Exception as e:
-                        logger.error(f"User {user_id}: Tool execution error: {e}", exc_info=True)
-                        tool_results.append({
-                            "role": "tool",
-                            "tool_call_id": tool_call["id"],
-                            "content": json.dumps({"error": str(e)})
-                        })
-
-                # Add assistant message with tool_calls for proper API format
-                assistant_msg = {"role": "assistant", "content": response_text or ""}
-                assistant_msg["tool_calls"] = [
-                    {
-                        "id": tc["id"],
-                        "type": "function",
-                        "function": {
-                            "name": tc["name"],
-                            "arguments": json.dumps(tc["arguments"])
-                        }
+                if before_tool_round:
+                    before_tool_round(messages)
+
+                tool_results = await self._exec_tool_round(tool_calls, exec_tool)
+
+                # Add assistant message with tool_calls for proper API format, then the results
+                messages.append(self._build_assistant_tool_msg(response_text, tool_calls))
+                messages.extend(tool_results)
+
+            return response_text, total_tool_calls, None
+
+        except Exception as e:
+            logger.error("%s: OpenRouter processing error: %s", log_prefix, e, exc_info=True)
+            return None, total_tool_calls, e
+
+    @staticmethod
+    async def _exec_tool_round(
+        tool_calls: List[Dict[str, Any]],
+        exec_tool: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Execute one round of tool calls concurrently.
+
+        Identical calls (same name and arguments) in the round run once and
+        share the result.
+
+        Returns:
+            Tool messages in tool_call order
+        """
+        round_tasks: Dict[str, asyncio.Future] = {}
+
+        async def run(tool_call: Dict[str, Any]) -> Dict[str, Any]:
+            try:
+                key = f"{tool_call['name']}:{orjson.dumps(tool_call['arguments'], option=orjson.OPT_SORT_KEYS).decode()}"
+            except TypeError:
+                # Arguments orjson cannot serialize: run the call on its own
+                return await exec_tool(tool_call)
+            task = round_tasks.get(key)
+            if task is None:
+                task = round_tasks[key] = asyncio.ensure_future(exec_tool(tool_call))
+            result = await task
+            if result["tool_call_id"] != tool_call["id"]:
+                result = {**result, "tool_call_id": tool_call["id"]}
+            return result
+
+        # Independent tool calls run concurrently; gather keeps tool_call_id order
+        return await asyncio.gather(*(run(tc) for tc in tool_calls))
+
+    @staticmethod
+    def _build_assistant_tool_msg(
+        response_text: Optional[str],
+        tool_calls: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Build the assistant message that echoes the model's tool calls."""
+        return {
+            "role": "assistant",
+            "content": response_text or "",
+            "tool_calls": [
+                {
+                    "id": tc["id"],
+                    "type": "function",
+                    "function": {
+                        "name": tc["name"],
+                        "arguments": tc.get("arguments_raw") or orjson.dumps(tc["arguments"]).decode()
                     }
-                    for tc in tool_calls
-                ]
-                current_messages.append(assistant_msg)
+                }
+                for tc in tool_calls
+            ]
+        }
 
-                # Add tool results
-                for tr in tool_results:
-                    current_messages.append(tr)
+    async def _exec_tool(self, log_prefix: str, tool_call: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Execute a single tool call and build its tool message.
 
-            if response_text and mcp_was_used:
-                response_text += MCP_USED_INDICATOR
+        Args:
+            log_prefix: Prefix for log lines (user or PR being processed)
+            tool_call: Parsed tool call with id, name and arguments
 
-            return response_text, total_tool_calls, mcp_was_used
+        Returns:
+            Tool message for the conversation; errors are returned as content
+        """
+        tool_name = tool_call["name"]
+        tool_args = tool_call["arguments"]
 
+        try:
+            cache_key = self._tool_cache_key(tool_name, tool_args)
+            result_content = self._get_cached_tool_result(cache_key) if cache_key else None
+            if result_content is not None:
+                logger.info("%s: Tool %s (cache hit)", log_prefix, tool_name)
+            else:
+                logger.info("%s: Executing tool %s", log_prefix, tool_name)
+                result_content, is_error = await self._call_tool_shared(cache_key, tool_name, tool_args)
+
+                # Failed calls (flagged isError by the server) are never cached
+                if is_error:
+                    logger.error("%s: MCP tool %s returned error: %.200s", log_prefix, tool_name, result_content)
+                elif cache_key:
+                    self._cache_tool_result(cache_key, result_content)
+
+            return {
+                "role": "tool",
+                "tool_call_id": tool_call["id"],
+                "content": result_content
+            }
         except Exception as e:
-            logger.error(f"User {user_id}: OpenRouter processing error: {e}", exc_info=True)
-            return None, 0, False
+            logger.error("%s: Tool execution error: %s", log_prefix, e, exc_info=True)
+            return {
+                "role": "tool",
+                "tool_call_id": tool_call["id"],
+                "content": orjson.dumps({"error": str(e)}).decode()
+            }
+
+    @staticmethod
+    def _tool_cache_key(tool_name: str, tool_args: Dict[str, Any]) -> Optional[str]:
+        """
+        Build a cache key for a deterministic tool call, or None if not cacheable.
+
+        Model-supplied arguments that are not a dict or that orjson cannot
+        serialize (e.g. integers wider than 64 bits) make the call uncacheable.
+        """
+        if not TOOL_CACHE_ENABLED or tool_name not in CACHEABLE_TOOLS or not isinstance(tool_args, dict):
+            return None
+        query = tool_args.get("query") if tool_name == "rag_query" else None
+        if isinstance(query, str):
+            # Queries differing only in case or spacing share one entry
+            tool_args = {**tool_args, "query": " ".join(query.split()).casefold()}
+        try:
+            return f"{tool_name}:{orjson.dumps(tool_args, option=orjson.OPT_SORT_KEYS).decode()}"
+        except TypeError:
+            return None
+
+    async def _call_tool_shared(
+        self,
+        cache_key: Optional[str],
+        tool_name: str,
+        tool_args: Dict[str, Any]
+    ) -> Tuple[str, bool]:
+        """
+        Call an MCP tool; identical cacheable calls in flight share one request.
+
+        Returns:
+            Tuple of (result text, is_error)
+        """
+        if cache_key is None:
+            result = await self.mcp_manager.call_tool(tool_name, tool_args)
+            return result["result"], result.get("is_error", False)
+
+        task = self._inflight_tool_calls.get(cache_key)
+        if task is None:
+            task = asyncio.ensure_future(self.mcp_manager.call_tool(tool_name, tool_args))
+            self._inflight_tool_calls[cache_key] = task
+            task.add_done_callback(lambda _: self._inflight_tool_calls.pop(cache_key, None))
+        result = await asyncio.shield(task)
+        return result["result"], result.get("is_error", False)
+
+    def _get_cached_tool_result(self, key: str) -> Optional[str]:
+        """Return a cached tool result, or None if missing or expired."""
+        cached = self._tool_cache.get(key)
+        if cached is None:
+            return None
+        expires_at, result_content = cached
+        if expires_at < time.monotonic():
+            del self._tool_cache[key]
+            return None
+        self._tool_cache.move_to_end(key)
+        return result_content
+
+    def _cache_tool_result(self, key: str, result_content: str) -> None:
+        """Store a tool result, evicting the least recently used entries."""
+        self._tool_cache[key] = (time.monotonic() + TOOL_CACHE_TTL_SEC, result_content)
+        self._tool_cache.move_to_end(key)
+        while len(self._tool_cache) > TOOL_CACHE_MAX_ENTRIES:
+            self._tool_cache.popitem(last=False)
+
+    async def close(self) -> None:
+        """Release the OpenRouter HTTP connection pool."""
+        await self.openrouter_client.close()
 
     def get_tools_count(self) -> int:
         """Get number of available tools."""
@@ -237,8 +454,13 @@ Respond in user's language."""
         Returns:
             Tuple of (review_text, tool_calls_count)
         """
-        logger.info(f"Starting PR review for #{pr_number}")
-        current_date = datetime.now().strftime("%Y-%m-%d")
+        async with self._processing_semaphore:
+            return await self._review_pr(pr_number)
+
+    async def _review_pr(self, pr_number: int) -> Tuple[str, int]:
+        """Run the PR review tool loop."""
+        logger.info("Starting PR review for #%d", pr_number)
+        current_date = _today()
 
         system_prompt = {
             "role": "system",
@@ -251,96 +473,79 @@ Respond in user's language."""
         }
 
         messages = [system_prompt, user_prompt]
-        total_tool_calls = 0
-
-        try:
-            max_iterations = 15
-            iteration = 0
-            response_text = None
-
-            while iteration < max_iterations:
-                iteration += 1
-                logger.info(f"PR Review #{pr_number}: iteration {iteration}/{max_iterations}")
-
-                is_last_iteration = (iteration == max_iterations)
-                current_tools = None if is_last_iteration else self.openrouter_tools
-                # Use "required" on first iteration to force tool call, then "auto"
-                if iteration == 1:
-                    current_tool_choice = "required"
-                elif is_last_iteration:
-                    current_tool_choice = None
-                else:
-                    current_tool_choice = "auto"
-
-                response_text, tool_calls = await self.openrouter_client.chat_completion(
-                    messages=messages,
-                    tools=current_tools,
-                    tool_choice=current_tool_choice
-                )
-
-                if not tool_calls:
-                    logger.info(f"PR Review #{pr_number}: No tool calls, finalizing")
-
-                    if not response_text:
-                        logger.info(f"PR Review #{pr_number}: Empty response, forcing final answer")
-                        messages.append({
-                            "role": "user",
-                            "content": "Based on all the information gathered, provide the complete code review now."
-                        })
-                        response_text, _ = await self.openrouter_client.chat_completion(
-                            messages=messages,
-                            tools=None,
-                            tool_choice=None
-                        )
-                    break
-
-                logger.info(f"PR Review #{pr_number}: Processing {len(tool_calls)} tool calls")
-                total_tool_calls += len(tool_calls)
-
-                tool_results = []
-                for tool_call in tool_calls:
-                    tool_name = tool_call["name"]
-                    tool_args = tool_call["arguments"]
-
-                    logger.info(f"PR Review #{pr_number}: Executing tool {tool_name}")
-
-                    try:
-                        result = await self.mcp_manager.call_tool(tool_name, tool_args)
-                        result_content = result["result"]
-
-                        tool_results.append({
-                            "role": "tool",
-                            "tool_call_id": tool_call["id"],
-                            "content": result_content
-                        })
-                    except Exception as e:
-                        logger.error(f"PR Review #{pr_number}: Tool error: {e}", exc_info=True)
-                        tool_results.append({
-                            "role": "tool",
-                            "tool_call_id": tool_call["id"],
-                            "content": json.dumps({"error": str(e)})
-                        })
-
-                assistant_msg = {"role": "assistant", "content": response_text or ""}
-                assistant_msg["tool_calls"] = [
-                    {
-                        "id": tc["id"],
-                        "type": "function",
-                        "function": {
-                            "name": tc["name"],
-                            "arguments": json.dumps(tc["arguments"])
-                        }
-                    }
-                    for tc in tool_calls
-                ]
-                messages.append(assistant_msg)
-
-                for tr in tool_results:
-                    messages.append(tr)
+        review_tools = self.openrouter_tools + [_RESOLVE_REF_TOOL] if self.openrouter_tools else None
+        ref_store: Dict[str, str] = {}  # tool_call_id -> full result shortened to a stub
+
+        response_text, total_tool_calls, error = await self._run_tool_loop(
+            messages,
+            log_prefix=f"PR Review #{pr_number}",
+            max_iterations=15,
+            tools=review_tools,
+            tool_choice_for=_review_tool_choice,
+            exec_tool=functools.partial(self._exec_review_tool, pr_number, ref_store=ref_store),
+            final_answer_prompt="Based on all the information gathered, provide the complete code review now.",
+            is_complete=lambda text: REVIEW_VERDICT_HEADING in text,
+            # The model has read the previous round's results; keep only stubs of large ones
+            before_tool_round=functools.partial(self._compact_tool_results, ref_store=ref_store)
+        )
+        if error is not None:
+            return f"Error during review: {str(error)}", total_tool_calls
+
+        logger.info("PR Review #%d: Completed with %d tool calls", pr_number, total_tool_calls)
+        return response_text or "Failed to generate review.", total_tool_calls
+
+    async def _exec_review_tool(
+        self,
+        pr_number: int,
+        tool_call: Dict[str, Any],
+        ref_store: Dict[str, str]
+    ) -> Dict[str, Any]:
+        """Execute a PR review tool call, answering resolve_ref from stored results."""
+        if tool_call["name"] != RESOLVE_REF_TOOL_NAME:
+            return await self._exec_tool(f"PR Review #{pr_number}", tool_call)
+
+        tool_args = tool_call["arguments"]
+        ref = tool_args.get("ref") if isinstance(tool_args, dict) else None
+        content = ref_store.get(ref)
+        if content is None:
+            content = orjson.dumps({"error": f"Unknown ref: {ref}"}).decode()
+        logger.info("PR Review #%d: Resolved ref %s", pr_number, ref)
+        return {
+            "role": "tool",
+            "tool_call_id": tool_call["id"],
+            "content": content
+        }
 
-            logger.info(f"PR Review #{pr_number}: Completed with {total_tool_calls} tool calls")
-            return response_text or "Failed to generate review.", total_tool_calls
+    @staticmethod
+    def _compact_tool_results(messages: List[Dict[str, Any]], ref_store: Dict[str, str]) -> None:
+        """
+        Replace large tool results with a ref stub holding a short preview.
 
-        except Exception as e:
-            logger.error(f"PR Review #{pr_number}: Error: {e}", exc_info=True)
-            return f"Error during review: {str(e)}", total_tool_calls
+        Args:
+            messages: Conversation being sent to the model (modified in place)
+            ref_store: Receives the full content, keyed by tool_call_id
+        """
+        tool_names = {
+            tc["id"]: tc["function"]["name"]
+            for message in messages if message["role"] == "assistant"
+            for tc in message.get("tool_calls", ())
+        }
+        for index, message in enumerate(messages):
+            if message["role"] != "tool" or len(message["content"]) <= REVIEW_REF_MIN_CHARS:
+                continue
+            tool_name = tool_names.get(message["tool_call_id"])
+            if tool_name not in REVIEW_REF_TOOLS and tool_name != RESOLVE_REF_TOOL_NAME:
+                continue
+
+            ref = message["tool_call_id"]
+            content = message["content"]
+            ref_store[ref] = content
+            messages[index] = {
+                **message,
+                "content": orjson.dumps({
+                    "ref": ref,
+                    "size": len(content),
+                    "preview": content[:REVIEW_REF_PREVIEW_CHARS],
+                    "note": f"Shortened; call {RESOLVE_REF_TOOL_NAME} with this ref for the full content"
+                }).decode()
+            }
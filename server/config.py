@@ -1,6 +1,7 @@
 """Configuration module for backend server."""
 
 import os
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -11,7 +12,6 @@ load_dotenv(dotenv_path=env_path)
 # API Authentication
 BACKEND_API_KEY = os.getenv("BACKEND_API_KEY", "")
 if not BACKEND_API_KEY:
-    import sys
     print("=" * 80, flush=True)
     print("FATAL ERROR: Missing Environment Variables", flush=True)
     print("=" * 80, flush=True)
@@ -23,7 +23,6 @@ if not BACKEND_API_KEY:
 # OpenRouter Configuration
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", "")
 if not OPENROUTER_API_KEY:
-    import sys
     print("=" * 80, flush=True)
     print("FATAL ERROR: Missing Environment Variables", flush=True)
     print("=" * 80, flush=True)
@@ -33,6 +32,7 @@ if not OPENROUTER_API_KEY:
     sys.exit(1)
 
 OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "deepseek/deepseek-v3.2")
+OPENROUTER_AUDIO_MODEL = "openai/gpt-audio-mini"
 OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
 OPENROUTER_EMBEDDINGS_URL = "https://openrouter.ai/api/v1/embeddings"
 OPENROUTER_EMBEDDING_MODEL = "google/gemini-embedding-001"
@@ -52,11 +52,20 @@ MCP_RAG_SERVER_PATH = Path(__file__).parent / "mcp_rag" / "server.py"
 
 # Use system python if venv doesn't exist
 if not PYTHON_INTERPRETER.exists():
-    import sys
     PYTHON_INTERPRETER = Path(sys.executable)
 
+# Process env vars passed through to stdio MCP subprocesses (instead of the full env)
+_SUB_ENV_WHITELIST = tuple(sys.intern(key) for key in (
+    "PATH", "HOME", "LANG", "LC_ALL", "TMPDIR", "PYTHONPATH", "PYTHONUNBUFFERED",
+    "VIRTUAL_ENV", "SSL_CERT_FILE", "MCP_PRETTY_JSON",
+    # httpx and urllib read both spellings of the proxy variables
+    "HTTP_PROXY", "HTTPS_PROXY", "NO_PROXY", "ALL_PROXY",
+    "http_proxy", "https_proxy", "no_proxy", "all_proxy",
+))
+_SUB_BASE_ENV = {key: os.environ[key] for key in _SUB_ENV_WHITELIST if key in os.environ}
+
 # MCP Servers Configuration
-MCP_SERVERS = [
+MCP_SERVERS = (
     {
         "name": "github_copilot",
         "transport": "http",
@@ -69,15 +78,15 @@ MCP_SERVERS = [
         "command": str(PYTHON_INTERPRETER),
         "args": [str(MCP_RAG_SERVER_PATH)],
         "env": {
-            **os.environ.copy(),
+            **_SUB_BASE_ENV,
             "GITHUB_TOKEN": GITHUB_TOKEN,
             "GITHUB_OWNER": GITHUB_OWNER,
             "GITHUB_REPO": GITHUB_REPO,
             "SPECS_PATH": SPECS_PATH,
             "OPENROUTER_API_KEY": OPENROUTER_API_KEY
         }
-    }
-]
+    },
+)
 
 # Conversation settings
 MAX_CONVERSATION_HISTORY = 50
@@ -85,8 +94,16 @@ MAX_CONVERSATION_HISTORY = 50
 # Tool call settings
 TOOL_CALL_TIMEOUT = 120.0
 
+# Per-server connection timeout at startup; servers connect concurrently,
+# so one slow server does not eat into the others' budget
+MCP_CONNECT_TIMEOUT = 20.0
+
+# Maximum chat/review requests processed by the LLM at the same time;
+# further requests wait for a free slot instead of piling onto OpenRouter
+MAX_CONCURRENT_CHATS = int(os.getenv("MAX_CONCURRENT_CHATS", "4"))
+
 # Essential tools filter - only these tools will be sent to the model
-ESSENTIAL_TOOLS = [
+ESSENTIAL_TOOLS = frozenset({
     # RAG MCP - project structure (use first!)
     "get_project_structure",
     # GitHub Copilot MCP - file operations
@@ -104,7 +121,29 @@ ESSENTIAL_TOOLS = [
     "rag_query",
     "list_specs",
     "get_spec_content",
-]
+})
+
+# Tool result cache - deterministic read-only tools whose results are shared
+# across iterations and users for a short time
+TOOL_CACHE_ENABLED = os.getenv("TOOL_CACHE_ENABLED", "true").lower() == "true"
+TOOL_CACHE_TTL_SEC = 300  # 5 minutes
+TOOL_CACHE_MAX_ENTRIES = 512
+CACHEABLE_TOOLS = frozenset({
+    "get_project_structure",
+    "get_file_contents",
+    "rag_query",
+    "list_specs",
+    "get_spec_content",
+    "list_commits",
+    "list_issues",
+    "list_pull_requests",
+})
+
+# PR review: large results of these tools are shortened to a ref stub once the
+# model has read them, so later iterations don't resend whole files
+REVIEW_REF_TOOLS = frozenset({"get_file_contents"})
+REVIEW_REF_MIN_CHARS = 4096
+REVIEW_REF_PREVIEW_CHARS = 1024
 
 # Response indicator
 MCP_USED_INDICATOR = "\n\n✓ MCP was used"
@@ -112,3 +151,9 @@ MCP_USED_INDICATOR = "\n\n✓ MCP was used"
 # Voice input settings
 VOICE_MAX_DURATION_SEC = 60  # 1 minute
 VOICE_MAX_FILE_SIZE_MB = 10
+VOICE_USER_LOCKS_MAX = 10_000  # per-user FIFO locks kept in memory
+
+# Voice transcription cache (identical clips skip the audio model call)
+VOICE_CACHE_ENABLED = os.getenv("VOICE_CACHE_ENABLED", "true").lower() == "true"
+VOICE_CACHE_TTL_SEC = 24 * 60 * 60  # 24 hours
+VOICE_CACHE_MAX_ENTRIES = 1000
@@ -1,7 +1,8 @@
 """Conversation history manager with per-user storage."""
 
 import threading
-from typing import Dict, List
+from collections import deque
+from typing import Deque, Dict, List
 from config import MAX_CONVERSATION_HISTORY
 
 
@@ -9,16 +10,19 @@ class ConversationManager:
     """Thread-safe conversation history manager for multiple users."""
 
     def __init__(self):
-        self._histories: Dict[str, List[Dict[str, str]]] = {}
+        # Bounded deques: appends are O(1) and can never grow past the limit,
+        # even for callers that skip check_and_clear_if_full
+        self._histories: Dict[str, Deque[Dict[str, str]]] = {}
         self._lock = threading.Lock()
 
     def add_message(self, user_id: str, role: str, content: str) -> None:
         """Add message to user's conversation history."""
         with self._lock:
-            if user_id not in self._histories:
-                self._histories[user_id] = []
+            history = self._histories.get(user_id)
+            if history is None:
+                history = self._histories[user_id] = deque(maxlen=MAX_CONVERSATION_HISTORY)
 
-            self._histories[user_id].append({
+            history.append({
                 "role": role,
                 "content": content
             })
@@ -26,13 +30,13 @@ class ConversationManager:
     def get_history(self, user_id: str) -> List[Dict[str, str]]:
         """Retrieve user's conversation history."""
         with self._lock:
-            return self._histories.get(user_id, []).copy()
+            return list(self._histories.get(user_id, ()))
 
     def clear_history(self, user_id: str) -> None:
         """Clear user's conversation history."""
         with self._lock:
             if user_id in self._histories:
-                self._histories[user_id] = []
+                self._histories[user_id].clear()
 
     def check_and_clear_if_full(self, user_id: str) -> bool:
         """
@@ -44,11 +48,11 @@ class ConversationManager:
         with self._lock:
             if user_id in self._histories:
                 if len(self._histories[user_id]) >= MAX_CONVERSATION_HISTORY:
-                    self._histories[user_id] = []
+                    self._histories[user_id].clear()
                     return True
         return False
 
     def get_message_count(self, user_id: str) -> int:
         """Get current message count for user."""
         with self._lock:
-            return len(self._histories.get(user_id, []))
+            return len(self._histories.get(user_id, ()))
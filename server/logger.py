@@ -1,13 +1,28 @@
 """Logging configuration for the server."""
 
+import atexit
 import logging
+import queue
 import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+
+# Full tracebacks are logged at most once per interval per (logger, exception type)
+TRACEBACK_LOG_INTERVAL = 10.0  # seconds
+_traceback_logged_at: Dict[Tuple[str, type], float] = {}
+
+# Background listener that performs the actual stream writes
+_queue_listener: Optional[QueueListener] = None
 
 
 def setup_logging(level: int = logging.INFO) -> None:
     """
     Configure console logging.
 
+    Request handlers only enqueue records; a background listener thread
+    formats them and writes to stderr, so logging never blocks the event loop.
+
     Args:
         level: Logging level (default: INFO)
     """
@@ -16,22 +31,64 @@ def setup_logging(level: int = logging.INFO) -> None:
         datefmt='%Y-%m-%d %H:%M:%S'
     )
 
-    handler = logging.StreamHandler(sys.stdout)
+    global _queue_listener
+
+    handler = logging.StreamHandler(sys.stderr)
     handler.setFormatter(formatter)
     handler.setLevel(level)
 
-    # Force flush after each log
-    sys.stdout.reconfigure(line_buffering=True)
+    if _queue_listener is not None:
+        _queue_listener.stop()
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _queue_listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    _queue_listener.start()
 
     root_logger = logging.getLogger()
     root_logger.setLevel(level)
 
     # Clear existing handlers to avoid duplicates
     root_logger.handlers.clear()
-    root_logger.addHandler(handler)
+    root_logger.addHandler(QueueHandler(log_queue))
 
     logging.getLogger("httpx").setLevel(logging.WARNING)
     logging.getLogger("httpcore").setLevel(logging.WARNING)
     logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
 
     logging.info("Logging configured")
+
+
+@atexit.register
+def _stop_queue_listener() -> None:
+    """Flush queued records and stop the listener thread on interpreter exit."""
+    if _queue_listener is not None:
+        _queue_listener.stop()
+
+
+def log_error_throttled(logger: logging.Logger, message: str, exc: BaseException, *args) -> None:
+    """
+    Log a one-line error, attaching the traceback only once per interval.
+
+    During error bursts (e.g. an upstream outage) this avoids formatting the
+    same stack trace for every failed request.
+
+    Args:
+        logger: Logger to write to
+        message: Short description of what failed, as a %-format string
+        exc: Exception being handled
+        *args: Arguments for message, formatted only if the record is emitted
+    """
+    if not logger.isEnabledFor(logging.ERROR):
+        return
+
+    key = (logger.name, type(exc))
+    now = time.monotonic()
+    last_logged = _traceback_logged_at.get(key)
+    with_traceback = last_logged is None or now - last_logged >= TRACEBACK_LOG_INTERVAL
+    if with_traceback:
+        _traceback_logged_at[key] = now
+
+    logger.error(
+        message + ": %s: %s", *args, type(exc).__name__, exc,
+        exc_info=exc if with_traceback else None
+    )
@@ -19,6 +19,7 @@ from contextlib import asynccontextmanager
 print("Step 1/5: Core imports OK", flush=True)
 
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 import uvicorn
 
 print("Step 2/5: FastAPI imports OK", flush=True)
@@ -30,8 +31,9 @@ try:
     from logger import setup_logging
     from mcp_manager import MCPManager
     from chat_service import ChatService
-    from audio_service import AudioService, set_audio_service
-    from app import router, set_chat_service
+    from audio_service import AudioService
+    from app import router
+    from auth import APIKeyMiddleware
     print("Step 4/5: Application modules imported successfully", flush=True)
 except Exception as e:
     print(f"FATAL: Failed to import application modules: {e}", file=sys.stderr, flush=True)
@@ -57,6 +59,12 @@ async def lifespan(app: FastAPI):
     global mcp_manager, mcp_context, chat_service
 
     logger.info("=== MCP Backend Server Starting ===")
+
+    # Python 3.12+: run new tasks eagerly so coroutines that finish without
+    # suspending (cache hits, tool fan-out) skip a trip through the event loop
+    if hasattr(asyncio, "eager_task_factory"):
+        asyncio.get_running_loop().set_task_factory(asyncio.eager_task_factory)
+        logger.info("Eager task factory enabled")
     logger.info("Step 1/4: Initializing MCP Manager...")
 
     try:
@@ -78,8 +86,8 @@ async def lifespan(app: FastAPI):
             chat_service = ChatService(mcp_manager)
             chat_service.initialize()
 
-            # Set global chat service for router
-            set_chat_service(chat_service)
+            # Expose chat service to request handlers
+            app.state.chat_service = chat_service
             logger.info(f"Step 3/4: Chat service initialized with {chat_service.get_tools_count()} tools")
 
         except asyncio.TimeoutError:
@@ -87,20 +95,19 @@ async def lifespan(app: FastAPI):
             # Create minimal chat service without MCP
             chat_service = ChatService(None)
             chat_service.initialize()
-            set_chat_service(chat_service)
+            app.state.chat_service = chat_service
         except Exception as mcp_error:
             logger.error(f"Step 3/4: MCP initialization failed: {mcp_error}", exc_info=True)
             logger.warning("Step 3/4: Server will run without MCP tools")
             # Create minimal chat service without MCP
             chat_service = ChatService(None)
             chat_service.initialize()
-            set_chat_service(chat_service)
+            app.state.chat_service = chat_service
 
         # Initialize Audio Service
         logger.info("Step 4/4: Initializing Audio Service...")
         try:
-            audio_service = AudioService()
-            set_audio_service(audio_service)
+            app.state.audio_service = AudioService(chat_service=chat_service)
             logger.info("Step 4/4: Audio service initialized successfully (two-stage: audio→text)")
         except Exception as audio_error:
             logger.error(f"Step 4/4: Failed to initialize Audio Service: {audio_error}", exc_info=True)
@@ -125,6 +132,12 @@ async def lifespan(app: FastAPI):
             except Exception as e:
                 logger.warning(f"Error closing MCP context: {e}")
 
+        if chat_service:
+            try:
+                await chat_service.close()
+            except Exception as e:
+                logger.warning(f"Error closing chat service: {e}")
+
         logger.info("=== MCP Backend Server Stopped ===")
 
 
@@ -133,9 +146,13 @@ app = FastAPI(
     title="MCP Backend API",
     description="Backend API for EasyPomodoro Project Consultant with MCP integration",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
+# Verify X-API-Key for /api/* routes before routing
+app.add_middleware(APIKeyMiddleware)
+
 # Include router
 app.include_router(router)
 
@@ -149,14 +166,22 @@ def main():
     port = int(os.getenv("PORT", "8000"))
     host = os.getenv("HOST", "0.0.0.0")
 
-    logger.info(f"Starting server on {host}:{port}")
+    # libuv-based event loop when available (not supported on Windows)
+    try:
+        import uvloop  # noqa: F401
+        loop = "uvloop"
+    except ImportError:
+        loop = "asyncio"
+
+    logger.info(f"Starting server on {host}:{port} (event loop: {loop})")
 
     uvicorn.run(
         "main:app",
         host=host,
         port=port,
         reload=False,
-        log_level="info"
+        log_level="info",
+        loop=loop
     )
 
 
@@ -1,9 +1,9 @@
 """HTTP Streamable transport for MCP protocol (spec version 2025-03-26)."""
 
-import json
 import logging
 from typing import Any, Dict, List, Optional
 import httpx
+import orjson
 
 logger = logging.getLogger(__name__)
 
@@ -88,19 +88,20 @@ class MCPHttpClient:
 
         headers = self._get_headers()
 
-        logger.debug(f"MCP HTTP Request: {json.dumps(request)}")
-        logger.debug(f"Headers: {headers}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("MCP HTTP Request: %s", orjson.dumps(request).decode())
+            logger.debug("Headers: %s", headers)
 
         try:
             response = await self._client.post(
                 self.url,
                 headers=headers,
-                json=request
+                content=orjson.dumps(request)
             )
 
             # Log response details
-            logger.debug(f"Response status: {response.status_code}")
-            logger.debug(f"Response headers: {dict(response.headers)}")
+            logger.debug("Response status: %s", response.status_code)
+            logger.debug("Response headers: %s", response.headers)
 
             # Check for session ID in response
             if "mcp-session-id" in response.headers:
@@ -129,8 +130,9 @@ class MCPHttpClient:
                 return await self._parse_sse_response(response.text)
             else:
                 # Parse JSON response
-                result = response.json()
-                logger.debug(f"MCP HTTP Response: {json.dumps(result)}")
+                result = orjson.loads(response.content)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("MCP HTTP Response: %s", orjson.dumps(result).decode())
 
                 if "error" in result:
                     logger.error(f"MCP error: {result['error']}")
@@ -154,7 +156,7 @@ class MCPHttpClient:
                 data = line[5:].strip()
                 if data:
                     try:
-                        parsed = json.loads(data)
+                        parsed = orjson.loads(data)
                         if isinstance(parsed, dict) and "result" in parsed:
                             result = parsed["result"]
                         elif isinstance(parsed, list):
@@ -163,7 +165,7 @@ class MCPHttpClient:
                                 if isinstance(item, dict) and "result" in item:
                                     result = item["result"]
                                     break
-                    except json.JSONDecodeError:
+                    except orjson.JSONDecodeError:
                         logger.warning(f"Failed to parse SSE data: {data}")
 
         return result
@@ -237,7 +239,8 @@ class MCPHttpClient:
             arguments: Tool arguments
 
         Returns:
-            Tool execution result
+            Dict with the result text and an is_error flag set when the
+            server marked the call as failed
         """
         if not self._initialized:
             raise RuntimeError("MCP session not initialized")
@@ -256,9 +259,16 @@ class MCPHttpClient:
         )
 
         logger.info(f"=== HTTP MCP TOOL RESPONSE ===")
-        logger.info(f"Raw result type: {type(result)}, keys: {result.keys() if isinstance(result, dict) else 'N/A'}")
-        logger.info(f"Raw result: {json.dumps(result, indent=2) if isinstance(result, dict) else result}"[:500])
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"Raw result type: {type(result)}, keys: {result.keys() if isinstance(result, dict) else 'N/A'}")
+            # Preview only; the full result can be a whole file
+            if isinstance(result, dict):
+                preview = orjson.dumps(result, option=orjson.OPT_INDENT_2)[:500].decode(errors="ignore")
+            else:
+                preview = str(result)[:500]
+            logger.info("Raw result: %s", preview)
 
+        is_error = isinstance(result, dict) and bool(result.get("isError"))
         if result:
             # Handle content array format
             if isinstance(result, dict) and "content" in result:
@@ -274,11 +284,17 @@ class MCPHttpClient:
                             resource = item.get("resource", {})
                             if "text" in resource:
                                 text_parts.append(resource["text"])
-                return {"result": "\n".join(text_parts) if text_parts else json.dumps(result)}
+                return {
+                    "result": "\n".join(text_parts) if text_parts else orjson.dumps(result).decode(),
+                    "is_error": is_error
+                }
 
-            return {"result": json.dumps(result) if isinstance(result, dict) else str(result)}
+            return {
+                "result": orjson.dumps(result).decode() if isinstance(result, dict) else str(result),
+                "is_error": is_error
+            }
         else:
-            return {"result": "No result"}
+            return {"result": "No result", "is_error": is_error}
 
     def get_tools(self) -> List[Dict[str, Any]]:
         """Get cached list of available tools."""
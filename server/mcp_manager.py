@@ -8,7 +8,7 @@ from contextlib import AsyncExitStack, asynccontextmanager
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 
-from config import MCP_SERVERS, TOOL_CALL_TIMEOUT
+from config import MCP_CONNECT_TIMEOUT, MCP_SERVERS, TOOL_CALL_TIMEOUT
 from mcp_http_transport import MCPHttpClient
 
 logger = logging.getLogger(__name__)
@@ -34,18 +34,37 @@ class MCPManager:
         async with AsyncExitStack() as stack:
             self._exit_stack = stack
 
-            for server_config in MCP_SERVERS:
-                server_name = server_config["name"]
-                transport = server_config.get("transport", "stdio")
+            # HTTP handshakes run as background tasks while stdio servers start.
+            # stdio contexts hold anyio task groups, so they are entered in this
+            # task to be exited from it later.
+            http_configs = [c for c in MCP_SERVERS if c.get("transport", "stdio") == "http"]
+            http_tasks = [
+                asyncio.ensure_future(asyncio.wait_for(
+                    self._connect_http_server(server_config),
+                    timeout=MCP_CONNECT_TIMEOUT
+                ))
+                for server_config in http_configs
+            ]
 
-                try:
-                    if transport == "http":
-                        await self._connect_http_server(server_config)
-                    else:
-                        await self._connect_stdio_server(stack, server_config)
-                except Exception as e:
-                    logger.error(f"Failed to connect to {server_name}: {e}", exc_info=True)
-                    # Continue with other servers
+            try:
+                for server_config in MCP_SERVERS:
+                    if server_config.get("transport", "stdio") == "http":
+                        continue
+                    try:
+                        async with asyncio.timeout(MCP_CONNECT_TIMEOUT):
+                            await self._connect_stdio_server(stack, server_config)
+                    except Exception as e:
+                        self._log_connect_error(server_config["name"], e)
+                        # Continue with other servers
+            except BaseException:
+                for task in http_tasks:
+                    task.cancel()
+                raise
+
+            results = await asyncio.gather(*http_tasks, return_exceptions=True)
+            for server_config, result in zip(http_configs, results):
+                if isinstance(result, BaseException):
+                    self._log_connect_error(server_config["name"], result)
 
             await self._fetch_tools()
             self._connected = True
@@ -56,6 +75,14 @@ class MCPManager:
                 logger.info("Closing all MCP sessions")
                 await self._cleanup()
 
+    @staticmethod
+    def _log_connect_error(server_name: str, error: BaseException) -> None:
+        """Log a failed server connection; a timeout gets a one-line message."""
+        if isinstance(error, TimeoutError):
+            logger.error(f"Failed to connect to {server_name}: timeout after {MCP_CONNECT_TIMEOUT}s")
+        else:
+            logger.error(f"Failed to connect to {server_name}: {error}", exc_info=error)
+
     async def _connect_http_server(self, config: Dict) -> None:
         """Connect to HTTP MCP server."""
         server_name = config["name"]
@@ -66,8 +93,13 @@ class MCPManager:
         logger.info(f"  URL: {url}")
 
         client = MCPHttpClient(url=url, auth_token=auth_token)
-        await client.connect()
-        await client.initialize()
+        try:
+            await client.connect()
+            await client.initialize()
+        except BaseException:
+            # Failed or timed out handshake: don't leak the pooled HTTP client
+            await client.close()
+            raise
 
         self.http_clients[server_name] = client
         logger.info(f"{server_name} HTTP MCP client connected")
@@ -177,7 +209,8 @@ class MCPManager:
             arguments: Tool arguments
 
         Returns:
-            Tool execution result
+            Dict with the result text and an is_error flag set when the
+            server marked the call as failed
         """
         server_name = self.tool_server_map.get(tool_name)
         transport = self.tool_transport_map.get(tool_name)
@@ -185,10 +218,10 @@ class MCPManager:
         if not server_name:
             raise RuntimeError(f"Unknown tool: {tool_name}")
 
-        logger.info(f"=== MCP TOOL CALL ===")
-        logger.info(f"Server: {server_name} ({transport})")
-        logger.info(f"Tool: {tool_name}")
-        logger.info(f"Arguments: {arguments}")
+        logger.info("=== MCP TOOL CALL ===")
+        logger.info("Server: %s (%s)", server_name, transport)
+        logger.info("Tool: %s", tool_name)
+        logger.info("Arguments: %s", arguments)
 
         try:
             if transport == "http":
@@ -196,17 +229,18 @@ class MCPManager:
             else:
                 result = await self._call_stdio_tool(server_name, tool_name, arguments)
 
-            logger.info(f"=== MCP TOOL RESPONSE ===")
-            result_str = str(result.get("result", result) if isinstance(result, dict) else result)
-            logger.info(f"Response length: {len(result_str)} chars")
-            # Log short responses (potential errors or empty results)
-            if len(result_str) < 200:
-                logger.info(f"Response content: {result_str}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("=== MCP TOOL RESPONSE ===")
+                result_str = str(result.get("result", result) if isinstance(result, dict) else result)
+                logger.info("Response length: %d chars", len(result_str))
+                # Log short responses (potential errors or empty results)
+                if len(result_str) < 200:
+                    logger.info("Response content: %s", result_str)
             return result
 
         except Exception as e:
-            logger.error(f"=== MCP TOOL ERROR ===")
-            logger.error(f"Error: {e}", exc_info=True)
+            logger.error("=== MCP TOOL ERROR ===")
+            logger.error("Error: %s", e, exc_info=True)
             raise
 
     async def _call_http_tool(self, server_name: str, tool_name: str, arguments: Dict) -> Dict[str, Any]:
@@ -231,11 +265,12 @@ class MCPManager:
             timeout=TOOL_CALL_TIMEOUT
         )
 
+        is_error = bool(result.isError)
         if result.content:
             content_text = ""
             for item in result.content:
                 if hasattr(item, 'text'):
                     content_text += item.text
-            return {"result": content_text}
+            return {"result": content_text, "is_error": is_error}
         else:
-            return {"result": "No result"}
+            return {"result": "No result", "is_error": is_error}
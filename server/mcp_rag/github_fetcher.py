@@ -1,14 +1,25 @@
-"""GitHub API client for fetching files from repository."""
+"""GitHub API client for fetching files from repository.
 
+The legacy mcp_rag package deploys on its own, so this module has a twin
+in mcp_rag/github_fetcher.py. Keep the two files identical apart from this note.
+"""
+
+import asyncio
 import base64
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import httpx
 
 logger = logging.getLogger(__name__)
 
 GITHUB_API_BASE = "https://api.github.com"
 
+# Retry policy for rate limits (429) and transient server errors (5xx)
+MAX_RETRIES = 3
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
 
 class GitHubFetcher:
     """Fetches files from GitHub repository via API."""
@@ -34,7 +45,13 @@ class GitHubFetcher:
         """Get or create HTTP client."""
         if self._client is None:
             self._client = httpx.AsyncClient(
-                timeout=httpx.Timeout(30.0),
+                http2=True,
+                timeout=httpx.Timeout(30.0, connect=5.0),
+                limits=httpx.Limits(
+                    max_connections=32,
+                    max_keepalive_connections=16,
+                    keepalive_expiry=60.0
+                ),
                 headers={
                     "Authorization": f"Bearer {self.token}",
                     "Accept": "application/vnd.github.v3+json",
@@ -43,6 +60,39 @@ class GitHubFetcher:
             )
         return self._client
 
+    async def _get(self, url: str) -> httpx.Response:
+        """
+        GET with exponential backoff on 429/5xx, honoring Retry-After.
+
+        Args:
+            url: Request URL
+
+        Returns:
+            Successful response
+
+        Raises:
+            httpx.HTTPStatusError: If the request still fails after retries
+        """
+        client = await self._get_client()
+
+        for attempt in range(MAX_RETRIES + 1):
+            response = await client.get(url)
+            if response.status_code not in RETRYABLE_STATUS_CODES or attempt == MAX_RETRIES:
+                break
+
+            retry_after = response.headers.get("retry-after")
+            if retry_after and retry_after.isdigit():
+                delay = float(retry_after)
+            else:
+                delay = RETRY_BASE_DELAY * (2 ** attempt)
+            delay = min(delay, RETRY_MAX_DELAY)
+
+            logger.warning(f"GitHub API {response.status_code} for {url}, retrying in {delay:.1f}s ({attempt + 1}/{MAX_RETRIES})")
+            await asyncio.sleep(delay)
+
+        response.raise_for_status()
+        return response
+
     async def close(self) -> None:
         """Close HTTP client."""
         if self._client:
@@ -56,12 +106,11 @@ class GitHubFetcher:
         Returns:
             List of dicts with 'name', 'path', 'type' keys
         """
-        client = await self._get_client()
         url = f"{GITHUB_API_BASE}/repos/{self.owner}/{self.repo}/contents/{self.specs_path}"
 
         try:
-            response = await client.get(url)
-            response.raise_for_status()
+            response = await self._get(url)
+            logger.debug(f"GitHub API protocol: {response.http_version}")
 
             contents = response.json()
 
@@ -100,12 +149,10 @@ class GitHubFetcher:
             logger.info(f"Using cached content for {file_path}")
             return self._cache[file_path]
 
-        client = await self._get_client()
         url = f"{GITHUB_API_BASE}/repos/{self.owner}/{self.repo}/contents/{file_path}"
 
         try:
-            response = await client.get(url)
-            response.raise_for_status()
+            response = await self._get(url)
 
             data = response.json()
 
@@ -130,22 +177,39 @@ class GitHubFetcher:
         Fetch all files from specs folder with their content.
 
         Returns:
-            List of dicts with 'filename', 'path', 'content' keys
+            List of dicts with 'filename', 'path', 'sha', 'content' keys
         """
         files = await self.list_specs_files()
+        slots: List[Optional[Dict[str, str]]] = [None] * len(files)
 
-        results = []
-        for file_info in files:
+        async def fetch_one(i: int, file_info: Dict[str, str]) -> None:
             try:
                 content = await self.get_file_content(file_info["path"])
-                results.append({
-                    "filename": file_info["name"],
-                    "path": file_info["path"],
-                    "content": content
-                })
+            except httpx.HTTPStatusError as e:
+                # Still rate limited after retries - cancel the sibling fetches
+                if e.response.status_code == 429:
+                    raise
+                logger.error(f"Failed to fetch {file_info['name']}: {e}")
+                return
             except Exception as e:
                 logger.error(f"Failed to fetch {file_info['name']}: {e}")
+                return
+
+            slots[i] = {
+                "filename": file_info["name"],
+                "path": file_info["path"],
+                "sha": file_info.get("sha"),
+                "content": content
+            }
 
+        try:
+            async with asyncio.TaskGroup() as tg:
+                for i, file_info in enumerate(files):
+                    tg.create_task(fetch_one(i, file_info))
+        except ExceptionGroup as eg:
+            raise eg.exceptions[0]
+
+        results = [r for r in slots if r is not None]
         logger.info(f"Successfully fetched {len(results)} spec files")
         return results
 
@@ -154,7 +218,7 @@ class GitHubFetcher:
         self._cache.clear()
         logger.info("GitHub fetcher cache cleared")
 
-    async def get_directory_tree(self, path: str = "", max_depth: int = 4) -> str:
+    async def get_directory_tree(self, path: str = "", max_depth: int = 4) -> Tuple[str, bool]:
         """
         Get directory tree structure.
 
@@ -163,20 +227,22 @@ class GitHubFetcher:
             max_depth: Maximum depth to traverse
 
         Returns:
-            Tree structure as formatted string
+            Tuple of (tree structure as formatted string, complete); complete is
+            False if any directory failed to load and shows an error line instead
         """
-        client = await self._get_client()
+        failed = False
 
         async def fetch_dir(dir_path: str, depth: int, prefix: str = "") -> List[str]:
+            nonlocal failed
             if depth > max_depth:
                 return [f"{prefix}... (max depth reached)"]
 
             url = f"{GITHUB_API_BASE}/repos/{self.owner}/{self.repo}/contents/{dir_path}"
             try:
-                response = await client.get(url)
-                response.raise_for_status()
+                response = await self._get(url)
                 contents = response.json()
             except Exception as e:
+                failed = True
                 return [f"{prefix}(error: {e})"]
 
             if not isinstance(contents, list):
@@ -203,4 +269,4 @@ class GitHubFetcher:
 
         tree_lines = await fetch_dir(path, 1)
         root_name = path if path else f"{self.owner}/{self.repo}"
-        return f"{root_name}/\n" + "\n".join(tree_lines)
+        return f"{root_name}/\n" + "\n".join(tree_lines), not failed
@@ -1,9 +1,14 @@
 """RAG engine with FAISS vector search and OpenRouter embeddings."""
 
+import asyncio
+import hashlib
 import json
 import logging
 import os
-from typing import Dict, List, Tuple
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 import httpx
 import numpy as np
 
@@ -17,6 +22,21 @@ OPENROUTER_EMBEDDING_MODEL = "google/gemini-embedding-001"
 SIMILARITY_THRESHOLD = 0.6
 RAG_TOP_K = 5
 
+# Query embedding cache: repeated questions skip the embeddings round trip
+QUERY_CACHE_SIZE = 1024
+QUERY_CACHE_TTL = 24 * 60 * 60  # seconds
+
+# On-disk cache of built indexes, keyed by document identities
+INDEX_CACHE_DIR = Path(__file__).parent / ".cache"
+
+# Chunking used when building the index (part of the on-disk cache key)
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+
+# Bump when the chunking algorithm or the FAISS index type changes so cached
+# indexes built the old way are not reused
+INDEX_FORMAT_VERSION = "sq-fp16-v1"
+
 
 class EmbeddingError(Exception):
     """Exception for embedding-related errors."""
@@ -34,6 +54,10 @@ class RAGEngine:
         self.index = None
         self.metadata: List[Dict[str, str]] = []  # List of {text, filename}
         self._faiss = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._inflight: Dict[str, asyncio.Future] = {}  # text -> pending embedding request
+        self._query_buf = None  # Reused (1, dim) float32 buffer for search queries
+        self._query_cache: "OrderedDict[str, Tuple[float, np.ndarray]]" = OrderedDict()  # query -> (expires_at, embedding)
         self._embedding_dimension = None
 
     def _get_faiss(self):
@@ -46,9 +70,73 @@ class RAGEngine:
                 raise RuntimeError("FAISS not installed. Run: pip install faiss-cpu")
         return self._faiss
 
+    async def _get_client(self) -> httpx.AsyncClient:
+        """Get or create HTTP client for the embeddings API."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=True,
+                timeout=httpx.Timeout(60.0, connect=10.0),
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+                headers={"Authorization": f"Bearer {self.api_key}"}
+            )
+        return self._client
+
+    async def close(self) -> None:
+        """Close HTTP client."""
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
     async def get_embedding(self, text: str) -> List[float]:
         """
-        Get embedding for text using OpenRouter API.
+        Get embedding for text, sharing one request between concurrent callers.
+
+        Args:
+            text: Text to embed
+
+        Returns:
+            Embedding vector
+        """
+        task = self._inflight.get(text)
+        if task is None:
+            task = asyncio.ensure_future(self._request_embedding(text))
+            self._inflight[text] = task
+            task.add_done_callback(lambda _: self._inflight.pop(text, None))
+
+        # Shield so a cancelled caller doesn't cancel the request for the others
+        return await asyncio.shield(task)
+
+    async def get_query_embedding(self, query: str) -> np.ndarray:
+        """
+        Get embedding for a search query, served from an LRU cache with TTL.
+
+        Args:
+            query: Search query
+
+        Returns:
+            Embedding vector as float32 array
+        """
+        key = " ".join(query.split())
+        now = time.monotonic()
+
+        cached = self._query_cache.get(key)
+        if cached is not None:
+            expires_at, embedding = cached
+            if expires_at > now:
+                self._query_cache.move_to_end(key)
+                return embedding
+            del self._query_cache[key]
+
+        embedding = np.asarray(await self.get_embedding(key), dtype=np.float32)
+        self._query_cache[key] = (now + QUERY_CACHE_TTL, embedding)
+        self._query_cache.move_to_end(key)
+        while len(self._query_cache) > QUERY_CACHE_SIZE:
+            self._query_cache.popitem(last=False)
+        return embedding
+
+    async def _request_embedding(self, text: str) -> List[float]:
+        """
+        Request embedding for text from OpenRouter API.
 
         Args:
             text: Text to embed
@@ -59,48 +147,42 @@ class RAGEngine:
         if not self.api_key:
             raise EmbeddingError("OPENROUTER_API_KEY not set")
 
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-
         payload = {
             "model": self.model,
             "input": text
         }
 
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            try:
-                response = await client.post(
-                    self.embeddings_url,
-                    headers=headers,
-                    json=payload
-                )
-                response.raise_for_status()
-                data = response.json()
-
-                # OpenRouter returns embeddings in data[0].embedding format
-                if "data" in data and len(data["data"]) > 0:
-                    embedding = data["data"][0].get("embedding", [])
-                    if embedding:
-                        # Cache dimension for later use
-                        if self._embedding_dimension is None:
-                            self._embedding_dimension = len(embedding)
-                            logger.info(f"Embedding dimension: {self._embedding_dimension}")
-                        return embedding
-
-                raise EmbeddingError(f"Invalid embedding response: {data}")
-
-            except httpx.ConnectError:
-                raise EmbeddingError(f"Cannot connect to OpenRouter API")
-            except httpx.HTTPStatusError as e:
-                error_text = e.response.text
-                logger.error(f"OpenRouter embedding error: {e.response.status_code} - {error_text}")
-                raise EmbeddingError(f"OpenRouter API error: {e.response.status_code}")
-            except Exception as e:
-                raise EmbeddingError(f"Embedding error: {e}")
-
-    def chunk_document(self, content: str, chunk_size: int = 500, overlap: int = 50) -> List[str]:
+        client = await self._get_client()
+        try:
+            response = await client.post(
+                self.embeddings_url,
+                json=payload
+            )
+            response.raise_for_status()
+            data = response.json()
+
+            # OpenRouter returns embeddings in data[0].embedding format
+            if "data" in data and len(data["data"]) > 0:
+                embedding = data["data"][0].get("embedding", [])
+                if embedding:
+                    # Cache dimension for later use
+                    if self._embedding_dimension is None:
+                        self._embedding_dimension = len(embedding)
+                        logger.info(f"Embedding dimension: {self._embedding_dimension}")
+                    return embedding
+
+            raise EmbeddingError(f"Invalid embedding response: {data}")
+
+        except httpx.ConnectError:
+            raise EmbeddingError(f"Cannot connect to OpenRouter API")
+        except httpx.HTTPStatusError as e:
+            error_text = e.response.text
+            logger.error(f"OpenRouter embedding error: {e.response.status_code} - {error_text}")
+            raise EmbeddingError(f"OpenRouter API error: {e.response.status_code}")
+        except Exception as e:
+            raise EmbeddingError(f"Embedding error: {e}")
+
+    def chunk_document(self, content: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[str]:
         """
         Split document into chunks by paragraphs.
 
@@ -114,37 +196,65 @@ class RAGEngine:
         """
         paragraphs = content.split("\n\n")
         chunks = []
-        current_chunk = ""
+        # Collect paragraphs in a list and join on flush to keep chunking linear
+        current_parts: List[str] = []
+        current_len = 0
 
         for para in paragraphs:
             para = para.strip()
             if not para:
                 continue
 
-            if len(current_chunk) + len(para) + 2 <= chunk_size:
-                current_chunk = current_chunk + "\n\n" + para if current_chunk else para
-            else:
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                current_chunk = para
+            if current_parts and current_len + len(para) + 2 > chunk_size:
+                chunk = "\n\n".join(current_parts)
+                chunks.append(chunk)
+
+                # Carry the tail of the flushed chunk into the next one
+                current_parts = []
+                current_len = 0
+                tail = self._overlap_tail(chunk, overlap)
+                if tail and len(tail) + len(para) + 2 <= chunk_size:
+                    current_parts.append(tail)
+                    current_len = len(tail)
 
-        if current_chunk:
-            chunks.append(current_chunk.strip())
+            current_len += len(para) + 2 if current_parts else len(para)
+            current_parts.append(para)
+
+        if current_parts:
+            chunks.append("\n\n".join(current_parts))
 
         return [c for c in chunks if len(c) > 20]
 
+    @staticmethod
+    def _overlap_tail(chunk: str, overlap: int) -> str:
+        """Return the last ``overlap`` characters of a chunk, starting at a word boundary."""
+        if overlap <= 0 or len(chunk) <= overlap:
+            return ""
+
+        tail = chunk[-overlap:]
+        space = tail.find(" ")
+        if space >= 0:
+            tail = tail[space + 1:]
+        return tail.strip()
+
     async def build_index(self, documents: List[Dict[str, str]]) -> int:
         """
         Build FAISS index from documents.
 
         Args:
-            documents: List of {filename, content} dicts
+            documents: List of {filename, content} dicts, optionally with
+                the GitHub blob 'sha' used as the document identity
 
         Returns:
             Number of indexed chunks
         """
         faiss = self._get_faiss()
 
+        cache_key = self._cache_key(documents)
+        if self._load_cached_index(cache_key):
+            logger.info(f"Loaded cached FAISS index {cache_key} with {len(self.metadata)} chunks")
+            return len(self.metadata)
+
         all_chunks = []
         all_metadata = []
 
@@ -164,6 +274,7 @@ class RAGEngine:
         logger.info(f"Generating embeddings for {len(all_chunks)} chunks using OpenRouter")
 
         embeddings = []
+        failed_chunks = 0
         for i, chunk in enumerate(all_chunks):
             try:
                 emb = await self.get_embedding(chunk)
@@ -172,6 +283,7 @@ class RAGEngine:
                     logger.info(f"Embedded {i + 1}/{len(all_chunks)} chunks")
             except Exception as e:
                 logger.error(f"Failed to embed chunk {i}: {e}")
+                failed_chunks += 1
                 # Use zero vector as fallback
                 dim = self._embedding_dimension or 768
                 embeddings.append([0.0] * dim)
@@ -183,15 +295,75 @@ class RAGEngine:
         norms[norms == 0] = 1
         embeddings_array = embeddings_array / norms
 
-        # Create FAISS index
+        # Create FAISS index with fp16 storage (half the memory of a flat float32 index)
         dimension = embeddings_array.shape[1]
-        self.index = faiss.IndexFlatIP(dimension)
+        self.index = faiss.IndexScalarQuantizer(
+            dimension,
+            faiss.ScalarQuantizer.QT_fp16,
+            faiss.METRIC_INNER_PRODUCT
+        )
+        self.index.train(embeddings_array)
         self.index.add(embeddings_array)
         self.metadata = all_metadata
+        self._query_buf = np.empty((1, dimension), dtype=np.float32)
 
         logger.info(f"Built FAISS index with {len(all_chunks)} chunks (dim={dimension})")
+
+        # Don't persist indexes that contain zero-vector fallbacks
+        if failed_chunks == 0:
+            self._save_cached_index(cache_key)
+
         return len(all_chunks)
 
+    def _cache_key(self, documents: List[Dict[str, str]]) -> str:
+        """Build a cache key from document identities, the embedding model and index settings."""
+        identities = []
+        for doc in documents:
+            doc_id = doc.get("sha") or hashlib.blake2b(
+                doc["content"].encode("utf-8"), digest_size=16
+            ).hexdigest()
+            identities.append(f"{doc['filename']}:{doc_id}")
+
+        key_source = (
+            f"{INDEX_FORMAT_VERSION}|{CHUNK_SIZE}|{CHUNK_OVERLAP}|{self.model}|"
+            + "|".join(sorted(identities))
+        )
+        return hashlib.blake2b(key_source.encode("utf-8"), digest_size=16).hexdigest()
+
+    def _load_cached_index(self, key: str) -> bool:
+        """Load a previously built index from disk. Returns True on cache hit."""
+        index_path = INDEX_CACHE_DIR / f"rag-{key}.faiss"
+        metadata_path = INDEX_CACHE_DIR / f"rag-{key}.json"
+
+        if not index_path.exists() or not metadata_path.exists():
+            return False
+
+        faiss = self._get_faiss()
+        try:
+            index = faiss.read_index(str(index_path))
+            with open(metadata_path, "r", encoding="utf-8") as f:
+                metadata = json.load(f)
+        except Exception as e:
+            logger.warning(f"Failed to load cached index {key}: {e}")
+            return False
+
+        self.index = index
+        self.metadata = metadata
+        self._query_buf = np.empty((1, index.d), dtype=np.float32)
+        return True
+
+    def _save_cached_index(self, key: str) -> None:
+        """Persist the current index and metadata to disk."""
+        faiss = self._get_faiss()
+        try:
+            INDEX_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            faiss.write_index(self.index, str(INDEX_CACHE_DIR / f"rag-{key}.faiss"))
+            with open(INDEX_CACHE_DIR / f"rag-{key}.json", "w", encoding="utf-8") as f:
+                json.dump(self.metadata, f, ensure_ascii=False)
+            logger.info(f"Saved FAISS index to cache: {key}")
+        except Exception as e:
+            logger.warning(f"Failed to save index cache {key}: {e}")
+
     async def search(
         self,
         query: str,
@@ -213,30 +385,36 @@ class RAGEngine:
             logger.warning("No index built, returning empty results")
             return []
 
-        query_embedding = await self.get_embedding(query)
-        query_array = np.array([query_embedding], dtype=np.float32)
+        query_embedding = await self.get_query_embedding(query)
+
+        # Copy into the preallocated buffer and normalize in place (no await until search is done)
+        faiss = self._get_faiss()
+        self._query_buf[0, :] = query_embedding
+        faiss.normalize_L2(self._query_buf)
 
-        # Normalize query
-        norm = np.linalg.norm(query_array)
-        if norm > 0:
-            query_array = query_array / norm
+        # Search: FAISS filters by threshold, we only rank the matches
+        lims, scores, indices = self.index.range_search(self._query_buf, threshold)
+        scores = scores[lims[0]:lims[1]]
+        indices = indices[lims[0]:lims[1]]
 
-        # Search
-        scores, indices = self.index.search(query_array, min(top_k * 2, len(self.metadata)))
+        if len(scores) > top_k:
+            top = np.argpartition(-scores, top_k)[:top_k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
 
         # Log top scores for debugging
-        top_scores = [f"{s:.3f}" for s in scores[0][:5] if s > 0]
-        logger.info(f"Top similarity scores: {top_scores}, threshold: {threshold}")
+        if logger.isEnabledFor(logging.INFO):
+            top_scores = [f"{s:.3f}" for s in scores[top][:5]]
+            logger.info("Top similarity scores: %s, threshold: %s", top_scores, threshold)
 
         results = []
-        for score, idx in zip(scores[0], indices[0]):
+        for score, idx in zip(scores[top], indices[top]):
             if idx < 0 or idx >= len(self.metadata):
                 continue
-            if score >= threshold:
-                chunk_data = self.metadata[idx]
-                results.append((chunk_data["text"], float(score), chunk_data["filename"]))
+            chunk_data = self.metadata[idx]
+            results.append((chunk_data["text"], score, chunk_data["filename"]))
 
-        results = results[:top_k]
         logger.info(f"Found {len(results)} relevant chunks for query")
         return results
 
@@ -258,4 +436,5 @@ class RAGEngine:
         """Clear the index."""
         self.index = None
         self.metadata = []
+        self._query_buf = None
         logger.info("RAG index cleared")
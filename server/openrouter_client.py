@@ -1,16 +1,20 @@
 """OpenRouter API client integration."""
 
 import base64
-import json
 import logging
 from typing import List, Dict, Any, Optional, Tuple
 
 import httpx
+import orjson
 
-from config import OPENROUTER_API_KEY, OPENROUTER_MODEL, OPENROUTER_API_URL
+from config import OPENROUTER_API_KEY, OPENROUTER_AUDIO_MODEL, OPENROUTER_MODEL, OPENROUTER_API_URL
 
 logger = logging.getLogger(__name__)
 
+# Providers that only cache prompts at explicit cache_control breakpoints;
+# others (OpenAI, DeepSeek, ...) cache stable prefixes automatically
+CACHE_CONTROL_MODEL_PREFIXES = ("anthropic/", "google/gemini")
+
 
 class OpenRouterClient:
     """Client for OpenRouter API with tool support."""
@@ -19,6 +23,32 @@ class OpenRouterClient:
         self.api_key = OPENROUTER_API_KEY
         self.model = OPENROUTER_MODEL
         self.api_url = OPENROUTER_API_URL
+        self._client: Optional[httpx.AsyncClient] = None
+        self._use_cache_control = self.model.startswith(CACHE_CONTROL_MODEL_PREFIXES)
+
+    async def _get_client(self) -> httpx.AsyncClient:
+        """Get or create HTTP client (keeps the TLS connection to OpenRouter alive)."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=True,
+                timeout=httpx.Timeout(60.0, connect=10.0),
+                limits=httpx.Limits(
+                    max_connections=100,
+                    max_keepalive_connections=20,
+                    keepalive_expiry=60.0
+                ),
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json"
+                }
+            )
+        return self._client
+
+    async def close(self) -> None:
+        """Close HTTP client."""
+        if self._client:
+            await self._client.aclose()
+            self._client = None
 
     def convert_mcp_tools_to_openrouter(self, mcp_tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
@@ -42,6 +72,21 @@ class OpenRouterClient:
             })
         return openrouter_tools
 
+    @staticmethod
+    def _with_cache_breakpoint(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Mark the system prompt as a prompt-cache breakpoint (tools + system are cached)."""
+        if not messages or messages[0].get("role") != "system" or not isinstance(messages[0].get("content"), str):
+            return messages
+        system_msg = {
+            "role": "system",
+            "content": [{
+                "type": "text",
+                "text": messages[0]["content"],
+                "cache_control": {"type": "ephemeral"}
+            }]
+        }
+        return [system_msg, *messages[1:]]
+
     async def chat_completion(
         self,
         messages: List[Dict[str, str]],
@@ -59,14 +104,9 @@ class OpenRouterClient:
         Returns:
             Tuple of (response_text, tool_calls)
         """
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-
         payload = {
             "model": self.model,
-            "messages": messages
+            "messages": self._with_cache_breakpoint(messages) if self._use_cache_control else messages
         }
 
         if tools:
@@ -76,22 +116,20 @@ class OpenRouterClient:
                 logger.info(f"Using tool_choice: {tool_choice}")
 
         logger.info(f"OpenRouter request: model={self.model}, messages={len(messages)}, tools={len(tools) if tools else 0}")
-        logger.debug(f"OpenRouter payload: {json.dumps(payload, indent=2)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("OpenRouter payload: %s", orjson.dumps(payload, option=orjson.OPT_INDENT_2).decode())
 
         message_roles = [msg.get("role") for msg in messages]
         logger.info(f"Message roles: {message_roles}")
 
         try:
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
-                    self.api_url,
-                    headers=headers,
-                    json=payload
-                )
-                response.raise_for_status()
-                data = response.json()
+            client = await self._get_client()
+            response = await client.post(self.api_url, content=orjson.dumps(payload))
+            response.raise_for_status()
+            data = orjson.loads(response.content)
 
-            logger.debug(f"OpenRouter response: {json.dumps(data, indent=2)}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("OpenRouter response: %s", orjson.dumps(data, option=orjson.OPT_INDENT_2).decode())
 
             if "choices" not in data or not data["choices"]:
                 logger.error("Invalid OpenRouter response: no choices")
@@ -115,7 +153,9 @@ class OpenRouterClient:
                         parsed_tool_calls.append({
                             "id": tc.get("id"),
                             "name": func.get("name"),
-                            "arguments": json.loads(func.get("arguments", "{}"))
+                            "arguments": orjson.loads(func.get("arguments", "{}")),
+                            # Original JSON string, echoed back in the assistant message
+                            "arguments_raw": func.get("arguments", "{}")
                         })
                 return response_text, parsed_tool_calls
             else:
@@ -158,7 +198,7 @@ class OpenRouterClient:
     async def audio_completion(
         self,
         messages: List[Dict[str, str]],
-        audio_file_path: str,
+        audio_bytes: bytes,
         language: str = "ru",
         tools: Optional[List[Dict[str, Any]]] = None,
         tool_choice: Optional[str] = None
@@ -168,7 +208,7 @@ class OpenRouterClient:
 
         Args:
             messages: Conversation history (text only)
-            audio_file_path: Path to audio file (.mp3)
+            audio_bytes: MP3-encoded audio
             language: Language code for transcription
             tools: Available tools in OpenRouter format
             tool_choice: Tool selection strategy ("auto", "required", "none")
@@ -176,19 +216,12 @@ class OpenRouterClient:
         Returns:
             Tuple of (transcription, response_text, audio_tokens_used, tool_calls)
         """
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-
         try:
-            # Read and encode audio file to base64
-            with open(audio_file_path, "rb") as audio_file:
-                audio_bytes = audio_file.read()
-                audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
+            # Encode audio to base64
+            audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
 
             # Determine audio format from file extension
-            audio_format = "mp3"  # Default to mp3 after ffmpeg conversion
+            audio_format = "mp3"  # Always mp3 after conversion
 
             # Build message with audio input (OpenRouter/OpenAI format)
             user_message = {
@@ -208,7 +241,7 @@ class OpenRouterClient:
             all_messages = messages + [user_message]
 
             payload = {
-                "model": "openai/gpt-audio-mini",
+                "model": OPENROUTER_AUDIO_MODEL,
                 "messages": all_messages,
                 "modalities": ["text"]  # We only want text output
             }
@@ -221,16 +254,13 @@ class OpenRouterClient:
 
             logger.info(f"OpenRouter audio request: model=gpt-audio-mini, messages={len(all_messages)}, audio_size={len(audio_bytes)} bytes, tools={len(tools) if tools else 0}")
 
-            async with httpx.AsyncClient(timeout=90.0) as client:
-                response = await client.post(
-                    self.api_url,
-                    headers=headers,
-                    json=payload
-                )
-                response.raise_for_status()
-                result = response.json()
+            client = await self._get_client()
+            response = await client.post(self.api_url, content=orjson.dumps(payload), timeout=90.0)
+            response.raise_for_status()
+            result = orjson.loads(response.content)
 
-            logger.debug(f"OpenRouter audio response: {json.dumps(result, indent=2)}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("OpenRouter audio response: %s", orjson.dumps(result, option=orjson.OPT_INDENT_2).decode())
 
             if "choices" not in result or not result["choices"]:
                 logger.error("Invalid OpenRouter audio response: no choices")
@@ -255,7 +285,9 @@ class OpenRouterClient:
                         parsed_tool_calls.append({
                             "id": tc.get("id"),
                             "name": func.get("name"),
-                            "arguments": json.loads(func.get("arguments", "{}"))
+                            "arguments": orjson.loads(func.get("arguments", "{}")),
+                            # Original JSON string, echoed back in the assistant message
+                            "arguments_raw": func.get("arguments", "{}")
                         })
 
             # gpt-audio-mini does NOT return separate transcription
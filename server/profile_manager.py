@@ -1,12 +1,17 @@
 """Profile manager for personalization logic."""
 
 import logging
-from typing import Optional
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
 from user_profile import UserProfile
 from profile_storage import ProfileStorage
 
 logger = logging.getLogger(__name__)
 
+# Built profile contexts kept in memory (least recently used are evicted)
+CONTEXT_CACHE_MAX_ENTRIES = 1024
+
 
 class ProfileManager:
     """Manages user profiles and generates personalized context."""
@@ -14,6 +19,9 @@ class ProfileManager:
     def __init__(self, storage: Optional[ProfileStorage] = None):
         """Initialize profile manager."""
         self.storage = storage or ProfileStorage()
+        # user_id -> (storage version, context); any profiles write invalidates
+        self._context_cache: "OrderedDict[str, Tuple[Tuple[int, int, int, int], str]]" = OrderedDict()
+        self._context_cache_lock = threading.Lock()
 
     def get_profile(self, user_id: str) -> Optional[UserProfile]:
         """Get user profile by ID."""
@@ -37,12 +45,15 @@ class ProfileManager:
 
         # Save and return
         self.storage.save_profile(user_id, profile)
+        self._invalidate_context(user_id)
         logger.info(f"Updated profile for user_id: {user_id}")
         return profile
 
     def delete_profile(self, user_id: str) -> bool:
         """Delete user profile."""
-        return self.storage.delete_profile(user_id)
+        deleted = self.storage.delete_profile(user_id)
+        self._invalidate_context(user_id)
+        return deleted
 
     def profile_exists(self, user_id: str) -> bool:
         """Check if profile exists."""
@@ -52,7 +63,33 @@ class ProfileManager:
         """
         Build structured context from user profile.
         Model will decide which parts to use based on the question.
+
+        The result is cached per user until the profiles file changes, so
+        repeated messages skip reading and parsing the whole file.
         """
+        version = self.storage.version()
+        with self._context_cache_lock:
+            cached = self._context_cache.get(user_id)
+            if cached is not None and cached[0] == version:
+                self._context_cache.move_to_end(user_id)
+                return cached[1]
+
+        context = self._build_context(user_id)
+
+        with self._context_cache_lock:
+            self._context_cache[user_id] = (version, context)
+            self._context_cache.move_to_end(user_id)
+            while len(self._context_cache) > CONTEXT_CACHE_MAX_ENTRIES:
+                self._context_cache.popitem(last=False)
+        return context
+
+    def _invalidate_context(self, user_id: str) -> None:
+        """Drop the cached context of a user whose profile was written."""
+        with self._context_cache_lock:
+            self._context_cache.pop(user_id, None)
+
+    def _build_context(self, user_id: str) -> str:
+        """Build structured context from the stored profile (reads the profiles file)."""
         profile = self.get_profile(user_id)
         if not profile:
             return ""
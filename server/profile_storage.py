@@ -4,7 +4,7 @@ import json
 import logging
 import os
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
 from filelock import FileLock
 from user_profile import UserProfile
 
@@ -21,6 +21,8 @@ class ProfileStorage:
 
         self.profiles_file = self.data_dir / "user_profiles.json"
         self.lock_file = self.data_dir / "user_profiles.lock"
+        # Bumped on every write from this process; see version()
+        self._write_count = 0
 
         # Create empty profiles file if it doesn't exist
         if not self.profiles_file.exists():
@@ -49,6 +51,22 @@ class ProfileStorage:
             except Exception as e:
                 logger.error(f"Error writing profiles: {e}")
                 raise
+            finally:
+                self._write_count += 1
+
+    def version(self) -> Tuple[int, int, int, int]:
+        """
+        Token that changes whenever the profiles file may have changed.
+
+        Combines the in-process write counter (exact even when two writes land
+        within one filesystem timestamp tick) with the file's mtime, size and
+        inode (catches edits made outside this process).
+        """
+        try:
+            st = os.stat(self.profiles_file)
+        except FileNotFoundError:
+            return (self._write_count, 0, 0, 0)
+        return (self._write_count, st.st_mtime_ns, st.st_size, st.st_ino)
 
     def load_profile(self, user_id: str) -> Optional[UserProfile]:
         """Load user profile by ID."""
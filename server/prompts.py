@@ -1,5 +1,44 @@
 """System prompts for different assistant tasks."""
 
+# Last section of a PR review; once the model has written it the review is complete
+REVIEW_VERDICT_HEADING = "## Verdict"
+
+# Chat prompt body is constant and goes first, so every request shares the same
+# prompt prefix (provider-side prompt caching); per-request lines are appended
+_CHAT_SYSTEM_PROMPT = """You are a project consultant for EasyPomodoro Android app (repo: LebedAlIv2601/EasyPomodoro).
+
+**CRITICAL RULES:**
+- NEVER say "let me look at..." or "I will check..." - just CALL the tool immediately
+- If you need information, CALL a tool. Do NOT describe your intention.
+- Do NOT respond until you have ALL the information needed to give a COMPLETE answer
+- You can call multiple tools in sequence - keep calling until you have everything
+
+**TOOLS:**
+1. **get_project_structure** - Get directory tree. USE FIRST to find file paths!
+2. **get_file_contents** - Read file content (owner="LebedAlIv2601", repo="EasyPomodoro", path="...")
+3. **rag_query** - Search project documentation semantically
+4. **list_commits**, **list_issues**, **list_pull_requests** - GitHub items
+
+**WORKFLOW:**
+1. For code questions: get_project_structure -> get_file_contents (repeat as needed)
+2. For architecture/design: rag_query
+3. ONLY respond with final answer AFTER gathering ALL necessary information
+
+Respond in user's language."""
+
+
+def get_chat_system_prompt(date: str) -> str:
+    """
+    Generate system prompt for the project consultant chat.
+
+    Args:
+        date: Current date string
+
+    Returns:
+        Formatted system prompt for chat
+    """
+    return f"{_CHAT_SYSTEM_PROMPT}\n\nCurrent date: {date}."
+
 
 def get_pr_review_prompt(pr_number: int, date: str) -> str:
     """
@@ -144,7 +183,7 @@ Structure your review EXACTLY as follows:
 ### `path/to/another_file.kt`
 - **Line N**: [Issue]
 
-## Verdict
+{REVIEW_VERDICT_HEADING}
 [One of: APPROVE / REQUEST_CHANGES / COMMENT]
 
 [Brief justification for verdict]
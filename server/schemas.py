@@ -1,12 +1,17 @@
 """Pydantic schemas for API request/response models."""
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, Any
 
+# Models are built once per request and never mutated afterwards
+IMMUTABLE_MODEL_CONFIG = ConfigDict(frozen=True, extra="ignore")
+
 
 class ChatRequest(BaseModel):
     """Request model for chat endpoint."""
 
+    model_config = IMMUTABLE_MODEL_CONFIG
+
     user_id: str = Field(..., description="Unique user identifier")
     message: str = Field(..., min_length=1, description="User message text")
 
@@ -14,6 +19,8 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     """Response model for chat endpoint."""
 
+    model_config = IMMUTABLE_MODEL_CONFIG
+
     response: str = Field(..., description="Assistant response text")
     tool_calls_count: int = Field(default=0, description="Number of tool calls made")
     mcp_used: bool = Field(default=False, description="Whether MCP tools were used")
@@ -22,6 +29,8 @@ class ChatResponse(BaseModel):
 class HealthResponse(BaseModel):
     """Response model for health check endpoint."""
 
+    model_config = IMMUTABLE_MODEL_CONFIG
+
     status: str = Field(default="healthy")
     mcp_connected: bool = Field(default=False)
     tools_count: int = Field(default=0)
@@ -30,6 +39,8 @@ class HealthResponse(BaseModel):
 class ErrorResponse(BaseModel):
     """Response model for error cases."""
 
+    model_config = IMMUTABLE_MODEL_CONFIG
+
     error: str = Field(..., description="Error message")
     detail: Optional[str] = Field(None, description="Detailed error information")
 
@@ -37,12 +48,16 @@ class ErrorResponse(BaseModel):
 class ReviewPRRequest(BaseModel):
     """Request model for PR review endpoint."""
 
+    model_config = IMMUTABLE_MODEL_CONFIG
+
     pr_number: int = Field(..., description="Pull Request number to review")
 
 
 class ReviewPRResponse(BaseModel):
     """Response model for PR review endpoint."""
 
+    model_config = IMMUTABLE_MODEL_CONFIG
+
     review: str = Field(..., description="Code review text with file:line references")
     tool_calls_count: int = Field(default=0, description="Number of MCP tool calls made")
 
@@ -50,6 +65,8 @@ class ReviewPRResponse(BaseModel):
 class ProfileUpdateRequest(BaseModel):
     """Request model for updating user profile."""
 
+    model_config = IMMUTABLE_MODEL_CONFIG
+
     # Allow partial updates with any fields from UserProfile
     data: dict[str, Any] = Field(..., description="Profile fields to update")
 
@@ -57,6 +74,8 @@ class ProfileUpdateRequest(BaseModel):
 class ProfileResponse(BaseModel):
     """Response model for profile endpoints."""
 
+    model_config = IMMUTABLE_MODEL_CONFIG
+
     message: str = Field(..., description="Success message")
     profile: Optional[dict] = Field(None, description="User profile data")
 
@@ -64,6 +83,8 @@ class ProfileResponse(BaseModel):
 class VoiceResponse(BaseModel):
     """Response model for voice endpoint."""
 
+    model_config = IMMUTABLE_MODEL_CONFIG
+
     transcription: Optional[str] = Field(default=None, description="Recognized text from audio (may be None for gpt-audio-mini)")
     response: str = Field(..., description="AI assistant response")
     latency_ms: int = Field(..., description="Processing time in milliseconds")